@@ -4,9 +4,8 @@ from langchain.messages import SystemMessage, HumanMessage
 from llm import get_llm
 from models.financial_summary import FinancialSummary
 
-analysis_llm = get_llm()
-
 def run_analysis_agent(summary: FinancialSummary, user_question: str) -> str:
+    analysis_llm = get_llm()
     json_summary = summary.model_dump()
 
     messages = [
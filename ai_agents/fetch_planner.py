@@ -0,0 +1,149 @@
+import json
+import threading
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List
+
+from models.financial_summary import FinancialSummary
+from tools.get_financials import get_financials
+from tools.get_metrics import get_metrics
+from tools.get_financial_line_items import get_financial_line_items
+from tools.get_stock_prices import get_stock_prices
+
+TOOLS = {
+    "get_metrics": get_metrics,
+    "get_financial_line_items": get_financial_line_items,
+    "get_financials": get_financials,
+    "get_stock_prices": get_stock_prices,
+}
+
+# Statement fields returned by get_financials that are also FinancialSummary fields
+# (`outstanding_shares` comes back as `weighted_average_shares`).
+FINANCIALS_FIELDS = {
+    "capital_expenditure",
+    "depreciation_and_amortization",
+    "net_income",
+    "outstanding_shares",
+    "total_assets",
+    "total_liabilities",
+    "shareholders_equity",
+    "dividends_and_other_cash_distributions",
+    "issuance_or_purchase_of_equity_shares",
+    "gross_profit",
+    "revenue",
+    "free_cash_flow",
+    "current_assets",
+    "current_liabilities",
+}
+
+# When two endpoints cover the same fields, prefer the one earlier in this list
+# (line items are searched in batches, so they are cheaper than per-ticker statements).
+ENDPOINT_PREFERENCE = ["get_metrics", "get_financial_line_items", "get_financials", "get_stock_prices"]
+
+# Tools whose results are kept for the whole run, because a later stage asks for them again
+# (the research stage re-reads the pre-screen's prices). Other payloads are only shared between identical calls
+# in flight at the same time, so a full-universe run does not hold every statement in memory.
+SHARED_TOOLS = {"get_stock_prices"}
+
+
+def build_endpoint_fields(line_items: Iterable[str]) -> Dict[str, set]:
+    """Maps each data tool to the FinancialSummary fields it can provide."""
+    line_items = set(line_items)
+    metric_fields = set(FinancialSummary.model_fields) - line_items - FINANCIALS_FIELDS - {"ticker", "price"}
+    return {
+        "get_metrics": metric_fields,
+        "get_financial_line_items": line_items,
+        "get_financials": set(FINANCIALS_FIELDS),
+        "get_stock_prices": {"price"},
+    }
+
+
+def plan_fetches(required_fields: Iterable[str], endpoint_fields: Dict[str, set]) -> List[str]:
+    """
+    Computes the smallest set of tools covering the required fields (greedy set cover).
+    Fields no tool provides are ignored.
+    """
+    remaining = set(required_fields) & set().union(*endpoint_fields.values())
+    plan = []
+    while remaining:
+        best = max(
+            (name for name in ENDPOINT_PREFERENCE if name not in plan),
+            key=lambda name: (len(endpoint_fields[name] & remaining), -ENDPOINT_PREFERENCE.index(name)),
+        )
+        plan.append(best)
+        remaining -= endpoint_fields[best]
+    return [name for name in ENDPOINT_PREFERENCE if name in plan]
+
+
+def normalize_params(tool_name: str, params: dict) -> dict:
+    """Fills in the defaults a tool would apply so equivalent calls share one key."""
+    params = {k: v for k, v in params.items() if v is not None}
+    if tool_name == "get_stock_prices":
+        end_date = params.get("end_date") or datetime.now().strftime('%Y-%m-%d')
+        params["end_date"] = end_date
+        if not params.get("start_date"):
+            dt_start = datetime.strptime(end_date, '%Y-%m-%d') - timedelta(days=7)
+            params["start_date"] = dt_start.strftime('%Y-%m-%d')
+    return params
+
+
+class FetchPlanner:
+    """
+    Plans and executes the data-tool calls of a run.
+
+    - `plan` is the minimal list of tools needed for the required FinancialSummary fields.
+    - Identical calls are coalesced: concurrent callers wait for the call already in
+      flight; for `shared_tools`, later callers (e.g. the backtesting stage) reuse its result.
+    """
+
+    def __init__(
+            self,
+            line_items: Iterable[str],
+            required_fields: Iterable[str] = None,
+            shared_tools: Iterable[str] = SHARED_TOOLS
+            ):
+        self.endpoint_fields = build_endpoint_fields(line_items)
+        self.shared_tools = set(shared_tools)
+        self.required_fields = set(required_fields or FinancialSummary.model_fields) - {"ticker"}
+        self.plan = plan_fetches(self.required_fields, self.endpoint_fields)
+        self._results = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+
+    def needs(self, tool_name: str) -> bool:
+        return tool_name in self.plan
+
+    def call(self, tool_name: str, **params) -> dict:
+        """Calls a data tool once per distinct set of parameters (single-flight)."""
+        params = normalize_params(tool_name, params)
+        key = (tool_name, json.dumps(params, sort_keys=True))
+
+        with self._lock:
+            future = self._results.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._results[key] = future
+                self.calls += 1
+            else:
+                self.coalesced += 1
+
+        if owner:
+            try:
+                result = TOOLS[tool_name].func(**params)
+                future.set_result(result)
+                failed = isinstance(result, dict) and "error" in result
+            except Exception as e:
+                future.set_exception(e)
+                failed = True
+
+            # Do not keep failures around, a later stage may retry
+            if failed or tool_name not in self.shared_tools:
+                with self._lock:
+                    self._results.pop(key, None)
+
+        return future.result()
+
+    def stats(self) -> dict:
+        return {"plan": list(self.plan), "calls": self.calls, "coalesced": self.coalesced}
@@ -1,15 +1,18 @@
-import json
+import os
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pydantic import BaseModel, Field
-from typing import List
+from typing import Iterator, List, Tuple
 
-from langchain_core.messages import SystemMessage, HumanMessage
-
-from llm import get_llm
+from llm import get_structured_llm
 from models.financial_summary import FinancialSummary, ToolStatus, Error, Result, ResearchAgentOutput
-from tools.get_financials import get_financials
-from tools.get_metrics import get_metrics
+from ai_agents.fetch_planner import FetchPlanner
+from ai_agents.research_mapper import map_payloads, map_history
+from ai_agents.research_prompt import build_research_messages, prompt_stats
+from ai_agents.research_store import research_store, fingerprint
+from ai_agents.research_checkpoint import ResearchCheckpoint
 from tools.get_financial_line_items import get_financial_line_items
-from tools.get_stock_prices import get_stock_prices
 
 REQUIRED_LIST = [
     "capital_expenditure",
@@ -28,120 +31,330 @@ REQUIRED_LIST = [
     "current_liabilities",
 ]
 
+# Shared by every stage of a run: plans the minimal tool calls and coalesces identical ones
+fetch_planner = FetchPlanner(REQUIRED_LIST)
+
+# How many tickers were mapped deterministically vs. structured by the LLM
+research_stats = Counter()
+_stats_lock = threading.Lock()
+
+# Number of tickers researched in parallel (overridable through the environment / .env file)
+RESEARCH_MAX_WORKERS = int(os.getenv("RESEARCH_MAX_WORKERS", "8"))
+
+# Number of annual periods requested per tool. The summary uses the latest period only, but
+# the multi-year trends (tools/analyze_trends.py) use every period: 10 years give the CAGRs
+# and growth variance up to 9 intervals.
+HISTORY_PERIODS = int(os.getenv("RESEARCH_HISTORY_PERIODS", "10"))
+METRICS_PERIODS = 1
+
+# Number of tickers sent in a single line-item search request
+LINE_ITEMS_BATCH_SIZE = int(os.getenv("LINE_ITEMS_BATCH_SIZE", "25"))
+
+
+def fetch_line_items_chunk(chunk: List[str], backtesting_date: str = None, limit: int = HISTORY_PERIODS) -> dict:
+    """
+    Fetches the line items of several tickers with one search request and splits the
+    `search_results` back per ticker. On failure the chunk is halved and retried, down
+    to single tickers, whose error (returned dict or raised exception) is kept as-is.
+    """
+    try:
+        # The search limit may apply to the whole result set, so ask for enough rows for every ticker
+        data = get_financial_line_items.func(
+            tickers=chunk,
+            line_items=REQUIRED_LIST,
+            period="annual",
+            limit=limit * len(chunk),
+            end_date=backtesting_date
+        )
+        failed = "error" in data and not str(data["error"]).startswith("No data found")
+    except Exception as e:
+        data, failed = e, True
+
+    if failed:
+        if len(chunk) == 1:
+            return {chunk[0]: data}
+        middle = len(chunk) // 2
+        results = fetch_line_items_chunk(chunk[:middle], backtesting_date, limit)
+        results.update(fetch_line_items_chunk(chunk[middle:], backtesting_date, limit))
+        return results
+
+    grouped = {ticker: [] for ticker in chunk}
+    for item in data.get("search_results") or []:
+        if item.get("ticker") in grouped:
+            grouped[item["ticker"]].append(item)
+
+    results = {}
+    for ticker, items in grouped.items():
+        # Keep the `limit` most recent periods, matching a single-ticker request
+        items = sorted(items, key=lambda f: f.get("report_period") or "", reverse=True)[:limit]
+        if items:
+            results[ticker] = {"search_results": items}
+        elif backtesting_date:
+            results[ticker] = {"error": f"No data found before {backtesting_date}"}
+        else:
+            results[ticker] = {"search_results": []}
+    return results
+
+
+def fetch_line_items_batch(
+        tickers: List[str],
+        backtesting_date: str = None,
+        batch_size: int = None,
+        max_workers: int = None
+        ) -> dict:
+    """
+    Batching stage for `get_financial_line_items`: groups the tickers into chunks and
+    issues one search per chunk (chunks run in parallel).
+    Returns a dict mapping each ticker to its payload, or to the exception raised for it.
+    """
+    batch_size = batch_size or LINE_ITEMS_BATCH_SIZE
+    chunks = [tickers[i:i + batch_size] for i in range(0, len(tickers), batch_size)]
+
+    line_items = {}
+    with ThreadPoolExecutor(max_workers=max_workers or RESEARCH_MAX_WORKERS) as executor:
+        for results in executor.map(lambda chunk: fetch_line_items_chunk(chunk, backtesting_date), chunks):
+            line_items.update(results)
+    return line_items
+
+
+def prefetched(payload):
+    """Returns a payload fetched by a batching stage, re-raising the error it captured."""
+    if isinstance(payload, Exception):
+        raise payload
+    return payload
+
+
+def fetch_tool_payloads(ticker: str, backtesting_date: str = None, line_items=None) -> tuple:
+    """
+    Calls the data tools in the fetch plan for a ticker concurrently.
+    `line_items` is the ticker's entry from `fetch_line_items_batch`; when given the
+    line-item search is not repeated for this ticker.
+    Returns the raw tool outputs (None for failed or skipped tools), the per-tool status
+    ("skipped" for tools the plan does not need) and the errors raised.
+    """
+    calls = {
+        "get_financials": lambda: fetch_planner.call(
+            "get_financials",
+            ticker=ticker,
+            period="annual",
+            limit=HISTORY_PERIODS,
+            end_date=backtesting_date
+            ),
+        "get_metrics": lambda: fetch_planner.call(
+            "get_metrics",
+            ticker=ticker,
+            period="annual",
+            limit=METRICS_PERIODS,
+            end_date=backtesting_date
+            ),
+        "get_financial_line_items": lambda: fetch_planner.call(
+            "get_financial_line_items",
+            tickers=[ticker],
+            line_items=REQUIRED_LIST,
+            period="annual",
+            limit=HISTORY_PERIODS,
+            end_date=backtesting_date
+            ),
+        "get_stock_prices": lambda: fetch_planner.call(
+            "get_stock_prices",
+            ticker=ticker,
+            end_date=backtesting_date
+            ),
+    }
+
+    if line_items is not None:
+        calls["get_financial_line_items"] = lambda: prefetched(line_items)
+
+    payloads = {name: None for name in calls}
+    errors = []
+    tool_status = {name: "ok" if fetch_planner.needs(name) else "skipped" for name in calls}
+    planned = {name: call for name, call in calls.items() if tool_status[name] == "ok"}
+
+    with ThreadPoolExecutor(max_workers=len(planned)) as executor:
+        futures = {name: executor.submit(call) for name, call in planned.items()}
+
+        # Collect in a fixed order so errors are always reported the same way
+        for name, future in futures.items():
+            try:
+                payloads[name] = future.result()
+            except Exception as e:
+                errors.append(Error(tool=name, message=str(e), ticker=ticker))
+                tool_status[name] = "error"
+
+    return payloads, tool_status, errors
+
+
+def research_ticker(
+        ticker: str,
+        backtesting_date: str,
+        structured_llm,
+        line_items=None,
+        force_refresh: bool = False,
+        history_sink: dict = None
+        ) -> tuple:
+    """
+    Researches a single ticker: fetches the tool data and maps it into a `Result`.
+    The LLM is only used when the deterministic mapping is ambiguous.
+    A stored Result is reused when the tool data has not changed, unless `force_refresh`.
+    With `history_sink`, the ticker's per-period `FinancialHistory` is stored in it.
+    Returns the `Result` (or None) and the errors to report at the agent level.
+    """
+    print(f"Researching {ticker}...")
+    payloads, tool_status, errors = fetch_tool_payloads(ticker, backtesting_date, line_items)
+
+    if all(status != "ok" for status in tool_status.values()):
+        return None, errors
+
+    if history_sink is not None:
+        history_sink[ticker] = map_history(ticker, payloads)
+
+    input_fingerprint = fingerprint(payloads, tool_status, backtesting_date)
+    if not force_refresh:
+        stored = research_store.load(ticker, backtesting_date, input_fingerprint)
+        if stored is not None:
+            with _stats_lock:
+                research_stats["reused"] += 1
+            print(f"Reusing stored research for {ticker} (inputs unchanged)")
+            return stored, []
+
+    result, ambiguous = map_payloads(ticker, payloads, tool_status, errors)
+    if not ambiguous:
+        with _stats_lock:
+            research_stats["mapped"] += 1
+        # Results built on failed tools are not stored, so the next run retries them
+        if not errors:
+            research_store.save(ticker, backtesting_date, input_fingerprint, result)
+        print(f"Research result for {ticker}: {result.model_dump_json(indent=2)}")
+        return result, []
+
+    print(f"Mapping for {ticker} is ambiguous, falling back to the LLM: {'; '.join(result.data_quality_notes)}")
+    with _stats_lock:
+        research_stats["llm"] += 1
+
+    try:
+        system_message, human_message = build_research_messages(
+            ticker, payloads, tool_status, errors, result.data_quality_notes
+        )
+        result = structured_llm.invoke([system_message, human_message])
+        result.tool_status = ToolStatus(**tool_status)
+        result.errors.extend(errors)
+        if not errors:
+            research_store.save(ticker, backtesting_date, input_fingerprint, result)
+        print(f"Research result for {ticker}: {result.model_dump_json(indent=2)}")
+        return result, []
+
+    except Exception as e:
+        return None, [Error(tool="processing_chain", message=str(e), ticker=ticker)]
+
+
+def iter_research_results(
+        tickers: List[str],
+        backtesting_date: str = None,
+        max_workers: int = None,
+        force_refresh: bool = False,
+        checkpoint_path: str = None,
+        line_items: dict = None,
+        history_sink: dict = None
+        ) -> Iterator[Tuple[str, Result, List[Error]]]:
+    """
+    Researches tickers in parallel and yields (ticker, result or None, errors) as each one finishes,
+    so later stages can start before the whole list is done (completion order, not request order).
+    Parallelism is bounded by `max_workers` (defaults to RESEARCH_MAX_WORKERS).
+    Tickers whose tool data is unchanged since the last run reuse the stored Result,
+    unless `force_refresh` is set.
+    With `checkpoint_path`, every successfully researched ticker is appended to that file, and
+    a restarted run yields the tickers already in it first without researching them again.
+    The checkpoint is deleted once the run completes, so the next run starts fresh.
+    `line_items` holds line-item payloads already fetched (e.g. by the pre-screen).
+    With `history_sink`, each ticker's `FinancialHistory` is stored in it (the checkpoint
+    keeps the histories, so restored tickers get theirs too).
+    """
+    structured_llm = get_structured_llm(Result)
+    research_stats.clear()
+    prompt_stats.clear()
+
+    checkpoint = ResearchCheckpoint(checkpoint_path) if checkpoint_path else None
+    pending = list(tickers)
+    if checkpoint:
+        requested = set(tickers)
+        done = set()
+        for ticker, result, errors, history in checkpoint.entries():
+            # Failed tickers are never recorded (older logs may hold some): they are retried
+            if ticker in requested and ticker not in done and result is not None:
+                done.add(ticker)
+                if history_sink is not None and history is not None:
+                    history_sink[ticker] = history
+                yield ticker, result, errors
+        pending = [ticker for ticker in tickers if ticker not in done]
+        if done:
+            print(f"Resuming from checkpoint: {len(done)} tickers already researched")
+
+    max_workers = max_workers or RESEARCH_MAX_WORKERS
+
+    # Line items are searched for many tickers per request instead of one request per ticker
+    line_items = dict(line_items or {})
+    missing = [ticker for ticker in pending if ticker not in line_items]
+    if missing and fetch_planner.needs("get_financial_line_items"):
+        line_items.update(fetch_line_items_batch(missing, backtesting_date, max_workers=max_workers))
+
+    def research(ticker):
+        return research_ticker(
+            ticker, backtesting_date, structured_llm, line_items.get(ticker), force_refresh, history_sink
+        )
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = {executor.submit(research, ticker): ticker for ticker in pending}
+        for future in as_completed(futures):
+            ticker = futures[future]
+            result, errors = future.result()
+            if checkpoint and result is not None:
+                history = history_sink.get(ticker) if history_sink is not None else None
+                checkpoint.append(ticker, result, errors, history)
+            yield ticker, result, errors
+    finally:
+        # On Ctrl-C (or if the consumer stops early) do not wait for the queued tickers
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    # Only an interrupted run is resumed; a finished one must not serve its results to the next run
+    if checkpoint:
+        checkpoint.clear()
+
+    print(
+        f"Research mapping: {research_stats['reused']} reused, "
+        f"{research_stats['mapped']} deterministic, {research_stats['llm']} via LLM"
+    )
+    if prompt_stats["prompts"]:
+        print(
+            f"Research prompts: ~{prompt_stats['raw_tokens']} tokens raw -> ~{prompt_stats['sent_tokens']} sent, "
+            f"{prompt_stats['sections_dropped']} sections dropped, {prompt_stats['over_budget']} over budget (not sent)"
+        )
+
 
 def run_research_agent(
         tickers: List[str],
-        backtesting_date: str = None
+        backtesting_date: str = None,
+        max_workers: int = None,
+        force_refresh: bool = False,
+        checkpoint_path: str = None
         ) -> str:
     """
     Runs the research agent to gather and structure financial data for a list of tickers.
+    Waits for every ticker and returns the output as JSON, in the requested ticker order.
+    Every result is held in memory until the end, so large runs should consume
+    `iter_research_results` directly. See it for the parameters.
     """
-    llm = get_llm()
-    structured_llm = llm.with_structured_output(Result)
+    finished = {}
+    for ticker, result, errors in iter_research_results(
+            tickers, backtesting_date, max_workers, force_refresh, checkpoint_path):
+        finished[ticker] = (result, errors)
 
     agent_output = ResearchAgentOutput(requested_tickers=tickers)
-
     for ticker in tickers:
-        print(f"Researching {ticker}...")
-        financials_data_str: str
-        metrics_data_str: str
-        line_items_data_str: str
-        prices_data_str: str
-        
-        financials_data, metrics_data, line_items_data, prices_data = {}, {}, {}, {}
-        errors = []
-        tool_status = {"get_financials": "ok", "get_metrics": "ok", "get_financial_line_items": "ok", "get_stock_prices": "ok"}
-
-        try:
-            financials_data = get_financials.func(
-                ticker=ticker, period="annual", 
-                limit=10, 
-                end_date=backtesting_date
-                )
-            financials_data_str = json.dumps(financials_data)
-        except Exception as e:
-            financials_data_str = f"Error: {e}"
-            errors.append(Error(tool="get_financials", message=str(e), ticker=ticker))
-            tool_status["get_financials"] = "error"
-
-        try:
-            metrics_data = get_metrics.func(
-                ticker=ticker, 
-                period="annual", 
-                limit=10, 
-                end_date=backtesting_date)
-            metrics_data_str = json.dumps(metrics_data)
-        except Exception as e:
-            metrics_data_str = f"Error: {e}"
-            errors.append(Error(tool="get_metrics", message=str(e), ticker=ticker))
-            tool_status["get_metrics"] = "error"
-        
-        try:
-            line_items_data = get_financial_line_items.func(
-                tickers=[ticker], 
-                line_items=REQUIRED_LIST, 
-                period="annual", 
-                limit=10, 
-                end_date=backtesting_date
-            )
-            line_items_data_str = json.dumps(line_items_data)
-        except Exception as e:
-            line_items_data_str = f"Error: {e}"
-            errors.append(Error(tool="get_financial_line_items", message=str(e), ticker=ticker))
-            tool_status["get_financial_line_items"] = "error"
-
-        try:
-            prices_data = get_stock_prices.func(
-                ticker=ticker,
-                end_date=backtesting_date
-                )
-            prices_data_str = json.dumps(prices_data)
-        except Exception as e:
-            prices_data_str = f"Error: {e}"
-            errors.append(Error(tool="get_stock_prices", message=str(e), ticker=ticker))
-            tool_status["get_stock_prices"] = "error"
-        
-        if all(status == "error" for status in tool_status.values()):
-            agent_output.errors.extend(errors)
+        if ticker not in finished:
             continue
-
-        try:
-            ########################################################
-            # This is the system message
-            ########################################################
-            system_message = SystemMessage(content="""You are ResearchAgent. Your goal is to process the raw JSON data from financial tools (`get_financials`, `get_metrics`, `get_financial_line_items`, `get_stock_prices`) for a given stock ticker and structure it into a specific JSON format defined by the `Result` model.
-            Rules:
-            - You will be given the raw JSON output from each of the three tools.
-            - Populate the `financial_summary` field using the provided data. All fields in `FinancialSummary` must be present; use null if a value is not available.
-            - Specifically for the `price` field in `FinancialSummary`, extract the latest closing price from the `get_stock_prices` output.
-            - Any keys from the raw tool output that are not part of the `FinancialSummary` model should be placed in the `extra_fields` dictionary.
-            - If a tool failed (indicated by an error message instead of JSON), reflect this in the `tool_status` and `errors` fields.
-            - Analyze the provided data for any potential inconsistencies or quality issues and add notes to `data_quality_notes`. For example, if `revenue` from one tool is drastically different from another.
-            - Use numbers when the source data is a number. If it's a string that looks like a number, try to convert it. If unsure, keep the original value and add a note to `data_quality_notes`. Do not use `NaN` or `Infinity`; use `null` instead.
-            - Output a valid JSON object matching the `Result` model only. Do not add any extra prose or markdown.
-            """)
-            ########################################################
-            # This is the human message
-            ########################################################
-            human_message = HumanMessage(content=f"""Please process the following data for the ticker: {ticker}
-            Raw output from `get_financials`:
-            {financials_data_str}
-
-            Raw output from `get_metrics`:
-            {metrics_data_str}
-
-            Raw output from `get_financial_line_items`:
-            {line_items_data_str}
-
-            Raw output from `get_stock_prices`:
-            {prices_data_str}
-            """)
-            result = structured_llm.invoke([system_message, human_message])
-            result.tool_status = ToolStatus(**tool_status)
-            result.errors.extend(errors)
+        result, errors = finished[ticker]
+        if result is not None:
             agent_output.results.append(result)
-            print(f"Research result for {ticker}: {result.model_dump_json(indent=2)}")
-            
-        except Exception as e:
-            agent_output.errors.append(Error(tool="processing_chain", message=str(e), ticker=ticker))
-    return agent_output.model_dump_json(indent=2)
\ No newline at end of file
+        agent_output.errors.extend(errors)
+    return agent_output.model_dump_json(indent=2)
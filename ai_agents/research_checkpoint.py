@@ -0,0 +1,83 @@
+import os
+import json
+import hashlib
+import threading
+from datetime import datetime
+from typing import Iterator, List, Tuple
+from dotenv import load_dotenv
+
+from models.financial_summary import Error, Result
+from models.financial_history import FinancialHistory
+
+load_dotenv()
+
+CHECKPOINT_DIR = os.getenv("RESEARCH_CHECKPOINT_DIR", os.path.join(".cache", "checkpoints"))
+
+
+def checkpoint_path(tickers: List[str], as_of: str = None) -> str:
+    """
+    Returns the checkpoint file of a research run.
+    Runs over the same tickers and as-of date share a file (latest runs are keyed by today's date).
+    """
+    run_date = as_of or f"latest-{datetime.now().strftime('%Y-%m-%d')}"
+    digest = hashlib.sha256(",".join(sorted(tickers)).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(CHECKPOINT_DIR, f"research_{run_date}_{digest}.jsonl")
+
+
+class ResearchCheckpoint:
+    """
+    Append-only JSONL log of a research run, one line per successfully researched ticker.
+    A restarted run skips the tickers already in the log; the log is deleted when the run completes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def entries(self) -> Iterator[Tuple[str, Result, List[Error], FinancialHistory]]:
+        """Yields (ticker, result or None, errors, history or None) for every finished ticker."""
+        try:
+            f = open(self.path, "r", encoding="utf-8")
+        except OSError:
+            return
+        with f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    result = Result.model_validate(entry["result"]) if entry.get("result") else None
+                    errors = [Error.model_validate(e) for e in entry.get("errors", [])]
+                    history = FinancialHistory.from_record(entry["history"]) if entry.get("history") else None
+                    ticker = entry["ticker"]
+                except (ValueError, KeyError, AttributeError):
+                    # A crash can leave a truncated last line, and an older schema fails
+                    # validation (a ValueError); that ticker is simply redone
+                    continue
+                yield ticker, result, errors, history
+
+    def append(
+            self,
+            ticker: str,
+            result: Result = None,
+            errors: List[Error] = None,
+            history: FinancialHistory = None
+            ) -> None:
+        """Durably records a finished ticker, with its history so a resumed run keeps the trends."""
+        line = json.dumps({
+            "ticker": ticker,
+            "result": result.model_dump() if result is not None else None,
+            "errors": [e.model_dump() for e in errors or []],
+            "history": history.to_record() if history is not None else None,
+        })
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def clear(self) -> None:
+        """Deletes the checkpoint so the next run starts from scratch."""
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
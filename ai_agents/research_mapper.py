@@ -0,0 +1,231 @@
+import math
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from models.financial_summary import FinancialSummary, ToolStatus, Error, Result
+from models.financial_history import FinancialHistory
+
+SUMMARY_FIELDS = [name for name in FinancialSummary.model_fields if name != "ticker"]
+
+# Alternative names under which the APIs return some FinancialSummary fields
+FIELD_ALIASES = {
+    "outstanding_shares": ["outstanding_shares", "weighted_average_shares"],
+    "revenue": ["revenue", "total_revenue"],
+}
+
+# Row keys that identify a period rather than carry a value
+ROW_KEYS = {"ticker", "report_period", "fiscal_period", "period", "currency", "calendar_date"}
+
+STATEMENT_TYPES = ["income_statements", "balance_sheets", "cash_flow_statements"]
+
+# Relative difference above which two tools are considered to disagree on a value
+# (per-share metrics may use weighted average rather than period-end share counts)
+CROSS_CHECK_TOLERANCE = 0.1
+# Per-share metrics of get_metrics and the line item each one is derived from
+PER_SHARE_CHECKS = {
+    "earnings_per_share": "net_income",
+    "book_value_per_share": "shareholders_equity",
+    "free_cash_flow_per_share": "free_cash_flow",
+}
+
+# Fields the downstream analysis cannot do without
+CORE_FIELDS = ["price", "return_on_equity", "debt_to_equity", "net_income", "revenue"]
+
+
+def to_number(value) -> Tuple[float, bool]:
+    """
+    Converts a raw value to a float.
+    Returns (number, ok); ok is False when a non-empty value could not be converted.
+    """
+    if value is None or isinstance(value, bool):
+        return None, value is None
+    if isinstance(value, (int, float)):
+        number = float(value)
+    elif isinstance(value, str):
+        try:
+            number = float(value.replace(",", "").strip())
+        except ValueError:
+            return None, False
+    else:
+        return None, False
+    # NaN and Infinity are not valid JSON numbers, treat them as missing
+    return (number, True) if math.isfinite(number) else (None, True)
+
+
+def latest_row(rows: List[dict], ticker: str = None) -> dict:
+    """Returns the most recent row (by report_period), optionally restricted to one ticker."""
+    rows = [r for r in rows or [] if isinstance(r, dict) and (ticker is None or r.get("ticker") in (None, ticker))]
+    if not rows:
+        return {}
+    return max(rows, key=lambda r: r.get("report_period") or "")
+
+
+def payload_rows(payload, key: str) -> List[dict]:
+    """Extracts the list of rows from a tool payload, ignoring error payloads."""
+    if not isinstance(payload, dict) or "error" in payload:
+        return []
+    rows = payload.get(key)
+    return rows if isinstance(rows, list) else []
+
+
+def financials_row(payload) -> dict:
+    """Merges the latest income statement, balance sheet and cash flow statement into one row."""
+    if not isinstance(payload, dict) or "error" in payload:
+        return {}
+    aggregator = payload.get("financials", payload)
+    if isinstance(aggregator, list):
+        aggregator = aggregator[0] if aggregator else {}
+    merged = {}
+    for key in STATEMENT_TYPES:
+        merged.update(latest_row(aggregator.get(key)))
+    return merged
+
+
+def read_field(row: dict, field: str):
+    """Returns the raw value of a field in a row, following aliases."""
+    for name in FIELD_ALIASES.get(field, [field]):
+        if row.get(name) is not None:
+            return row[name]
+    return None
+
+
+def map_payloads(
+        ticker: str,
+        payloads: Dict[str, dict],
+        tool_status: Dict[str, str],
+        errors: List[Error]
+        ) -> Tuple[Result, bool]:
+    """
+    Maps the raw tool payloads of a ticker into a `Result` without calling the LLM.
+
+    Values are taken from the latest period of each tool: metrics from `get_metrics`,
+    line items from `get_financial_line_items` (falling back to `get_financials`) and the
+    price from the last `get_stock_prices` close.
+    Returns the result and whether the mapping is ambiguous (per-share metrics that disagree
+    with the line items they derive from, or values that could not be read as numbers),
+    in which case the LLM should decide.
+    """
+    notes = []
+    ambiguous = False
+    values = {}
+    extra_fields = {}
+
+    sources = {
+        "get_metrics": latest_row(payload_rows(payloads.get("get_metrics"), "financial_metrics"), ticker),
+        "get_financial_line_items": latest_row(payload_rows(payloads.get("get_financial_line_items"), "search_results"), ticker),
+        "get_financials": financials_row(payloads.get("get_financials")),
+    }
+    prices = payload_rows(payloads.get("get_stock_prices"), "prices")
+
+    for name in ("get_metrics", "get_financial_line_items", "get_financials", "get_stock_prices"):
+        payload = payloads.get(name)
+        if isinstance(payload, dict) and "error" in payload:
+            notes.append(f"{name} returned an error: {payload['error']}")
+
+    # Sources are read in priority order, the first one with a value wins
+    for source, row in sources.items():
+        for field in SUMMARY_FIELDS:
+            raw = read_field(row, field)
+            if raw is None:
+                continue
+            number, ok = to_number(raw)
+            if not ok:
+                notes.append(f"{field} from {source} is not a number: {raw!r}")
+                ambiguous = True
+                continue
+            if isinstance(raw, str):
+                notes.append(f"{field} from {source} was converted from the string {raw!r}")
+            if field not in values and number is not None:
+                values[field] = number
+
+        for key, value in row.items():
+            if key in ROW_KEYS or key in FinancialSummary.model_fields:
+                continue
+            if any(key in aliases for aliases in FIELD_ALIASES.values()):
+                continue
+            extra_fields.setdefault(key, value)
+        if row.get("report_period"):
+            extra_fields[f"{source}_report_period"] = row["report_period"]
+
+    if prices:
+        close, ok = to_number(prices[-1].get("close"))
+        if ok and close is not None:
+            values["price"] = close
+            extra_fields["price_date"] = prices[-1].get("time")
+        elif not ok:
+            notes.append(f"Latest close is not a number: {prices[-1].get('close')!r}")
+            ambiguous = True
+
+    # The fetch plan never requests the same field from two tools, so cross-check the
+    # per-share metrics against the totals they derive from (same report period only)
+    metrics_period = sources["get_metrics"].get("report_period")
+    totals_period = sources["get_financial_line_items"].get("report_period")
+    shares = values.get("outstanding_shares")
+    if shares and (not metrics_period or not totals_period or metrics_period == totals_period):
+        for per_share_field, total_field in PER_SHARE_CHECKS.items():
+            a, _ = to_number(read_field(sources["get_metrics"], per_share_field))
+            total = values.get(total_field)
+            if a is None or total is None:
+                continue
+            b = total / shares
+            scale = max(abs(a), abs(b))
+            if scale and abs(a - b) / scale > CROSS_CHECK_TOLERANCE:
+                notes.append(
+                    f"{per_share_field} from get_metrics ({a:,.2f}) differs from "
+                    f"{total_field} / outstanding_shares ({b:,.2f})"
+                )
+                ambiguous = True
+
+    periods = {s: r.get("report_period") for s, r in sources.items() if r.get("report_period")}
+    if len(set(periods.values())) > 1:
+        notes.append("Latest report periods differ between tools: " + ", ".join(f"{s}={p}" for s, p in periods.items()))
+
+    missing = [field for field in CORE_FIELDS if field not in values]
+    if missing:
+        notes.append(f"Missing values for: {', '.join(missing)}")
+
+    result = Result(
+        ticker=ticker,
+        financial_summary=FinancialSummary(ticker=ticker, **values),
+        extra_fields=extra_fields,
+        tool_status=ToolStatus(**tool_status),
+        data_quality_notes=notes,
+        errors=list(errors),
+    )
+    return result, ambiguous
+
+
+def map_history(ticker: str, payloads: Dict[str, dict]) -> FinancialHistory:
+    """
+    Keeps every report period of the tool payloads as arrays, one per FinancialSummary field.
+    Line items take precedence over the statements of `get_financials` for the same period.
+    """
+    rows = [r for r in payload_rows(payloads.get("get_financial_line_items"), "search_results")
+            if isinstance(r, dict) and r.get("ticker") in (None, ticker)]
+    financials = payloads.get("get_financials")
+    if isinstance(financials, dict) and "error" not in financials:
+        aggregator = financials.get("financials", financials)
+        if isinstance(aggregator, list):
+            aggregator = aggregator[0] if aggregator else {}
+        for key in STATEMENT_TYPES:
+            rows.extend(r for r in aggregator.get(key) or [] if isinstance(r, dict))
+
+    by_period = {}
+    for row in rows:
+        period = row.get("report_period")
+        if not period:
+            continue
+        merged = by_period.setdefault(period, {})
+        for field in SUMMARY_FIELDS:
+            number, _ = to_number(read_field(row, field))
+            if number is not None and field not in merged:
+                merged[field] = number
+
+    periods = sorted(by_period)
+    fields = sorted({field for merged in by_period.values() for field in merged})
+    values = {
+        field: np.array([by_period[period].get(field, np.nan) for period in periods], dtype=np.float64)
+        for field in fields
+    }
+    return FinancialHistory(ticker=ticker, periods=periods, values=values)
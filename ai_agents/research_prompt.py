@@ -0,0 +1,155 @@
+import os
+import json
+import threading
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from langchain_core.messages import SystemMessage, HumanMessage
+
+from models.financial_summary import FinancialSummary, Error
+from ai_agents.research_mapper import FIELD_ALIASES, STATEMENT_TYPES
+
+# Maximum estimated input tokens for one research LLM call (overridable through the environment / .env file)
+RESEARCH_TOKEN_BUDGET = int(os.getenv("RESEARCH_TOKEN_BUDGET", "3000"))
+
+# Rough conversion used for budgeting; Gemini averages about 4 characters per token on JSON
+CHARS_PER_TOKEN = 4
+
+# Periods kept per tool, tried in order until the prompt fits the budget
+PERIODS_STEPS = [2, 1]
+
+# Tool sections left out, one more at a time, when even one period does not fit the budget
+# (get_financials is only a fallback source, the metrics carry most summary fields)
+SECTION_DROP_ORDER = ["get_financials", "get_financial_line_items", "get_metrics"]
+
+# Size of the research prompts sent in the current run
+prompt_stats = Counter()
+_stats_lock = threading.Lock()
+
+KEPT_FIELDS = (
+    set(FinancialSummary.model_fields)
+    | {alias for aliases in FIELD_ALIASES.values() for alias in aliases}
+    | {"report_period"}
+)
+
+SYSTEM_PROMPT = """You are ResearchAgent. Your goal is to process the JSON data from financial tools (`get_financials`, `get_metrics`, `get_financial_line_items`, `get_stock_prices`) for a given stock ticker and structure it into a specific JSON format defined by the `Result` model.
+Rules:
+- You will be given the output of each tool, trimmed to the latest periods and to the fields of `FinancialSummary`.
+- Populate the `financial_summary` field using the provided data. All fields in `FinancialSummary` must be present; use null if a value is not available.
+- Specifically for the `price` field in `FinancialSummary`, extract the latest closing price from the `get_stock_prices` output.
+- If a tool failed (indicated by an error message instead of JSON), reflect this in the `tool_status` and `errors` fields. A tool marked "Not requested" was skipped on purpose: its status is "skipped" and it is not an error.
+- Analyze the provided data for any potential inconsistencies or quality issues and add notes to `data_quality_notes`. For example, if `revenue` from one tool is drastically different from another.
+- Use numbers when the source data is a number. If it's a string that looks like a number, try to convert it. If unsure, keep the original value and add a note to `data_quality_notes`. Do not use `NaN` or `Infinity`; use `null` instead.
+- Output a valid JSON object matching the `Result` model only. Do not add any extra prose or markdown.
+"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimates the number of tokens of a prompt fragment."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def encode(data) -> str:
+    """Compact JSON encoding (no indentation, no spaces after separators)."""
+    return json.dumps(data, separators=(",", ":"), default=str)
+
+
+def prune_rows(rows, periods: int) -> list:
+    """Keeps the `periods` most recent rows, each with only the relevant non-null fields."""
+    if not isinstance(rows, list):
+        return []
+    rows = sorted((r for r in rows if isinstance(r, dict)), key=lambda r: r.get("report_period") or "", reverse=True)
+    return [{k: v for k, v in r.items() if k in KEPT_FIELDS and v is not None} for r in rows[:periods]]
+
+
+def prune_payload(name: str, payload: dict, periods: int):
+    """Trims a tool payload to what the `Result` model needs."""
+    if not isinstance(payload, dict) or "error" in payload:
+        return payload
+
+    if name == "get_stock_prices":
+        # Only the latest close is used
+        prices = payload.get("prices") or []
+        return {"prices": [{"time": p.get("time"), "close": p.get("close")} for p in prices[-1:]]}
+
+    if name == "get_financials":
+        aggregator = payload.get("financials", payload)
+        if isinstance(aggregator, list):
+            aggregator = aggregator[0] if aggregator else {}
+        return {key: prune_rows(aggregator.get(key), periods) for key in STATEMENT_TYPES}
+
+    key = "financial_metrics" if name == "get_metrics" else "search_results"
+    return {key: prune_rows(payload.get(key), periods)}
+
+
+def render_content(
+        ticker: str,
+        payloads: Dict[str, dict],
+        tool_status: Dict[str, str],
+        error_messages: Dict[str, str],
+        mapping_notes: List[str],
+        periods: int,
+        dropped: List[str]
+        ) -> str:
+    """Renders the human message with `periods` periods per tool and the `dropped` sections left out."""
+    sections = []
+    for name, data in payloads.items():
+        if name in dropped:
+            body = "Omitted to fit the token budget."
+        elif tool_status[name] == "ok":
+            body = encode(prune_payload(name, data, periods))
+        elif tool_status[name] == "skipped":
+            body = "Not requested: the fields it provides are covered by the other tools."
+        else:
+            body = f"Error: {error_messages.get(name, 'unknown error')}"
+        sections.append(f"Output from `{name}`:\n{body}")
+
+    content = f"Please process the following data for the ticker: {ticker}\n\n" + "\n\n".join(sections)
+    if mapping_notes:
+        content += "\n\nIssues found by the automatic mapping:\n" + "\n".join(f"- {note}" for note in mapping_notes)
+    return content
+
+
+def build_research_messages(
+        ticker: str,
+        payloads: Dict[str, dict],
+        tool_status: Dict[str, str],
+        errors: List[Error],
+        mapping_notes: List[str] = None,
+        token_budget: int = None
+        ) -> Tuple[SystemMessage, HumanMessage]:
+    """
+    Builds the research LLM prompt from pruned, compactly encoded tool payloads.
+    Fewer periods are kept, then whole tool sections are left out (SECTION_DROP_ORDER),
+    until the estimated prompt size fits `token_budget`.
+    Raises ValueError when even the smallest prompt is above the budget.
+    """
+    token_budget = token_budget or RESEARCH_TOKEN_BUDGET
+    error_messages = {error.tool: error.message for error in errors}
+
+    raw_tokens = estimate_tokens(SYSTEM_PROMPT) + sum(
+        estimate_tokens(json.dumps(data)) for data in payloads.values() if data is not None
+    )
+
+    # Smaller and smaller prompts: fewer periods first, then fewer sections
+    attempts = [(periods, []) for periods in PERIODS_STEPS]
+    attempts += [(PERIODS_STEPS[-1], SECTION_DROP_ORDER[:i]) for i in range(1, len(SECTION_DROP_ORDER) + 1)]
+    for periods, dropped in attempts:
+        content = render_content(ticker, payloads, tool_status, error_messages, mapping_notes, periods, dropped)
+        tokens = estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(content)
+        if tokens <= token_budget:
+            break
+
+    with _stats_lock:
+        prompt_stats["prompts"] += 1
+        prompt_stats["raw_tokens"] += raw_tokens
+        if tokens > token_budget:
+            prompt_stats["over_budget"] += 1
+        else:
+            prompt_stats["sent_tokens"] += tokens
+            prompt_stats["sections_dropped"] += len(dropped)
+
+    if tokens > token_budget:
+        raise ValueError(f"Research prompt for {ticker} is ~{tokens} tokens, above the budget of {token_budget}")
+
+    return SystemMessage(content=SYSTEM_PROMPT), HumanMessage(content=content)
@@ -0,0 +1,71 @@
+import os
+import json
+import hashlib
+import threading
+from dotenv import load_dotenv
+
+from models.financial_summary import Result
+
+load_dotenv()
+
+RESEARCH_STORE_DIR = os.getenv("RESEARCH_STORE_DIR", os.path.join(".cache", "research"))
+
+
+def normalize(data):
+    """Puts a payload in canonical form: row lists sorted by period, dict keys sorted on dump."""
+    if isinstance(data, dict):
+        return {k: normalize(v) for k, v in data.items()}
+    if isinstance(data, list):
+        items = [normalize(v) for v in data]
+        if all(isinstance(v, dict) for v in items):
+            items.sort(key=lambda r: (str(r.get("ticker", "")), str(r.get("report_period") or r.get("time") or "")))
+        return items
+    return data
+
+
+def fingerprint(payloads: dict, tool_status: dict, as_of: str = None) -> str:
+    """Hashes the normalized tool payloads of a ticker for a given as-of date."""
+    raw = json.dumps(
+        {"as_of": as_of, "tool_status": tool_status, "payloads": normalize(payloads)},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResearchStore:
+    """
+    Persists research `Result`s per ticker and as-of date together with the
+    fingerprint of the inputs they were computed from.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, ticker: str, as_of: str = None) -> str:
+        return os.path.join(self.directory, as_of or "latest", f"{ticker.replace('/', '_')}.json")
+
+    def load(self, ticker: str, as_of: str, input_fingerprint: str):
+        """Returns the stored Result if it was computed from the same inputs, else None."""
+        try:
+            with open(self._path(ticker, as_of), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            if entry.get("fingerprint") != input_fingerprint:
+                return None
+            # A result stored with an older Result schema fails validation (a ValueError)
+            # and is treated as a miss, so the ticker is simply researched again
+            return Result.model_validate(entry["result"])
+        except (OSError, ValueError, KeyError, AttributeError):
+            return None
+
+    def save(self, ticker: str, as_of: str, input_fingerprint: str, result: Result) -> None:
+        path = self._path(ticker, as_of)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": input_fingerprint, "result": result.model_dump()}, f)
+        os.replace(tmp_path, path)
+
+
+# Shared store instance used by the research agent
+research_store = ResearchStore(RESEARCH_STORE_DIR)
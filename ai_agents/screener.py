@@ -0,0 +1,81 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from models.financial_summary import FinancialSummary
+from models.summary_table import FinancialSummaryTable
+from ai_agents.research_agent import (
+    RESEARCH_MAX_WORKERS,
+    fetch_planner,
+    fetch_line_items_batch,
+    fetch_tool_payloads,
+)
+from ai_agents.research_mapper import map_payloads
+from tools.scoring_engine import score_universe, total_scores
+
+# Screening configuration (overridable through the environment / .env file)
+SCREEN_TOP_K = int(os.getenv("SCREEN_TOP_K", "50"))
+# Weight of the margin of safety (clipped to [-1, 1]) against the summed analyzer scores (max 19)
+SCREEN_MOS_WEIGHT = float(os.getenv("SCREEN_MOS_WEIGHT", "5"))
+
+
+def deterministic_summary(ticker: str, backtesting_date: str = None, line_items=None) -> FinancialSummary:
+    """Builds a ticker's FinancialSummary from the tool data alone, without the LLM."""
+    payloads, tool_status, errors = fetch_tool_payloads(ticker, backtesting_date, line_items)
+    result, _ = map_payloads(ticker, payloads, tool_status, errors)
+    return result.financial_summary
+
+
+def rank_summaries(summaries: List[FinancialSummary], mos_weight: float = None) -> List[Tuple[str, float]]:
+    """
+    Ranks summaries by the summed analyzer scores plus the weighted margin of safety.
+    Returns (ticker, screen score) pairs, best first.
+    """
+    mos_weight = SCREEN_MOS_WEIGHT if mos_weight is None else mos_weight
+    table = score_universe(summaries)
+    margin_of_safety = np.clip(np.nan_to_num(table["margin_of_safety"], nan=-1.0), -1.0, 1.0)
+    screen_scores = total_scores(table) + mos_weight * margin_of_safety
+    order = np.argsort(-screen_scores, kind="stable")
+    return [(summaries[i].ticker, float(screen_scores[i])) for i in order]
+
+
+def screen_universe(
+        tickers: List[str],
+        backtesting_date: str = None,
+        top_k: int = None,
+        holdings: Iterable[str] = (),
+        max_workers: int = None
+        ) -> Tuple[List[str], Dict[str, dict]]:
+    """
+    Quantitative pre-screen run before any LLM work.
+    Maps every ticker deterministically, ranks them with the scoring engine and keeps the
+    `top_k` best (defaults to SCREEN_TOP_K) plus the current holdings, in the original order.
+    Returns the kept tickers and the line-item payloads already fetched, for the research stage.
+    """
+    top_k = top_k or SCREEN_TOP_K
+    holdings = list(holdings)
+    # Holdings outside the universe are researched too, the later stages need their prices
+    outside = [ticker for ticker in holdings if ticker not in tickers]
+    if len(tickers) <= top_k:
+        return list(tickers) + outside, {}
+
+    max_workers = max_workers or RESEARCH_MAX_WORKERS
+    line_items = {}
+    if fetch_planner.needs("get_financial_line_items"):
+        line_items = fetch_line_items_batch(tickers, backtesting_date, max_workers=max_workers)
+
+    # The research stage gets the kept tickers' payloads back from the API cache
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        summaries = list(executor.map(
+            lambda ticker: deterministic_summary(ticker, backtesting_date, line_items.get(ticker)),
+            tickers,
+        ))
+
+    # The universe is scored as columns, without keeping a pydantic model per ticker
+    ranking = rank_summaries(FinancialSummaryTable.from_summaries(summaries))
+    selected = {ticker for ticker, _ in ranking[:top_k]}
+    kept = [ticker for ticker in tickers if ticker in selected or ticker in holdings] + outside
+    print(f"Pre-screen: kept {len(kept)} of {len(tickers)} tickers (top {top_k} plus holdings)")
+    return kept, {ticker: line_items[ticker] for ticker in kept if ticker in line_items}
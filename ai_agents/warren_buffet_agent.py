@@ -4,43 +4,40 @@ This script defines an investment agent that analyzes stocks according to Warren
 from langchain.tools import tool
 from langchain_core.messages import SystemMessage, HumanMessage
 
+import os
 import math
 import json
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 
 from models.financial_summary import FinancialSummary, WarrenBuffettSignal
-from llm import get_llm
+from models.financial_history import FinancialHistory
+from llm import get_structured_llm
 
-from tools.analyze_book_value_growth import analyze_book_value_growth
-from tools.analyze_consistency import analyze_consistency
-from tools.analyze_fundamentals import analyze_fundamentals
-from tools.analyze_management_quality import analyze_management_quality
-from tools.analyze_moat import analyze_moat
-from tools.analyze_pricing_power import analyze_pricing_power
-from tools.calculate_intrinsic_value import calculate_intrinsic_value
+from tools.scoring_engine import score_universe, analyzer_results, total_scores, MAX_TOTAL_SCORE
+from tools.valuation_engine import sensitivity_grid, distribution_summary
 
+# Number of tickers analyzed in parallel (overridable through the environment / .env file)
+BUFFETT_MAX_WORKERS = int(os.getenv("BUFFETT_MAX_WORKERS", "4"))
+# Number of researched tickers the pipeline hands to `warren_buffett_agent_batch` at once
+BUFFETT_BATCH_SIZE = int(os.getenv("BUFFETT_BATCH_SIZE", "25"))
 
-def warren_buffett_agent(summary: FinancialSummary) -> dict:
-    """
-    Runs the Warren Buffett agent to analyze a stock.
-    """
-    print(f"Analyzing {summary.ticker} with Warren Buffett agent...")
-    
-    llm = get_llm()
-    
-    # The tools now use the provided summary object directly, avoiding redundant API calls.
-    analysis_results = {
-        "fundamentals": analyze_fundamentals.func(summary=summary),
-        "consistency": analyze_consistency.func(summary=summary),
-        "moat": analyze_moat.func(summary=summary),
-        "management": analyze_management_quality.func(summary=summary),
-        "book_value_growth": analyze_book_value_growth.func(summary=summary),
-        "intrinsic_value": calculate_intrinsic_value.func(summary=summary),
-        "pricing_power": analyze_pricing_power.func(summary=summary),
-    }
-
-    structured_llm = llm.with_structured_output(WarrenBuffettSignal)
-
-    system_instruction = SystemMessage(content="""You are a virtual Warren Buffett. Your goal is to evaluate a company based on value investing principles and provide a final investment signal.
+# Business quality (summed scores rescaled to -1..1) beyond which the rules may decide a signal
+BUFFETT_UNCERTAINTY_BAND = float(os.getenv("BUFFETT_UNCERTAINTY_BAND", "0.3"))
+# Margin of safety a rule-based signal needs: at least this for bullish, at most minus this for bearish
+BUFFETT_MIN_MARGIN_OF_SAFETY = float(os.getenv("BUFFETT_MIN_MARGIN_OF_SAFETY", "0.3"))
+# Quality and margin of safety both within this of zero: an average business at a fair price
+BUFFETT_NEUTRAL_BAND = float(os.getenv("BUFFETT_NEUTRAL_BAND", "0.1"))
+# Percentile of the DCF scenario margins of safety the rules decide on (a conservative estimate)
+RULE_MOS_PERCENTILE = 25
+
+# How the signals of the current process were produced ("rules" or "llm")
+signal_stats = Counter()
+_stats_lock = threading.Lock()
+
+SYSTEM_PROMPT = """You are a virtual Warren Buffett. Your goal is to evaluate a company based on value investing principles and provide a final investment signal.
 
     Key Questions to Answer:
     - Is the business understandable and within a circle of competence? (Assume yes).
@@ -52,11 +49,126 @@ def warren_buffett_agent(summary: FinancialSummary) -> dict:
     Instructions:
     - Based strictly on the provided analysis data, determine a bullish, bearish, or neutral signal.
     - Assign a confidence score (0-100).
-    - Provide a brief, decisive reasoning.""")
-            
-    user_content = HumanMessage(content=f"""Here is the quantitative analysis for {summary.ticker}:{json.dumps(analysis_results, indent=2)}
+    - Provide a brief, decisive reasoning."""
+
+
+def build_signal_messages(ticker: str, analysis_results: dict) -> list:
+    """Builds the prompt asking for the investment signal of one ticker."""
+    system_instruction = SystemMessage(content=SYSTEM_PROMPT)
+    user_content = HumanMessage(content=f"""Here is the quantitative analysis for {ticker}:{json.dumps(analysis_results, indent=2)}
     Please generate the investment signal now.""")
-    
-    final_signal = structured_llm.invoke([system_instruction, user_content])
-    
-    return {summary.ticker: final_signal.model_dump()}
+    return [system_instruction, user_content]
+
+
+def rule_based_signal(
+        table: dict,
+        index: int,
+        band: float = None,
+        margin_of_safety: float = None
+        ) -> Optional[WarrenBuffettSignal]:
+    """
+    Deterministic signal for one row of a scoring-engine table.
+
+    Quality is the summed analyzer score rescaled to -1..1. The rules only decide when quality
+    and the margin of safety agree: bullish when quality is above `band` (defaults to
+    BUFFETT_UNCERTAINTY_BAND) and the margin of safety at least BUFFETT_MIN_MARGIN_OF_SAFETY,
+    bearish when both are as clearly negative, neutral when both lie within BUFFETT_NEUTRAL_BAND
+    of zero. `margin_of_safety` replaces the table's base-case value (e.g. a scenario percentile).
+    Every other case, and tickers without a margin of safety, return None and go to the LLM.
+    """
+    band = BUFFETT_UNCERTAINTY_BAND if band is None else band
+    if margin_of_safety is None:
+        margin_of_safety = float(table["margin_of_safety"][index])
+    if margin_of_safety is None or math.isnan(margin_of_safety):
+        return None
+
+    score = int(total_scores(table)[index])
+    quality = 2 * score / MAX_TOTAL_SCORE - 1
+    margin_of_safety = max(-1.0, min(1.0, margin_of_safety))
+    if quality > band and margin_of_safety >= BUFFETT_MIN_MARGIN_OF_SAFETY:
+        signal, conviction = "bullish", min(quality, margin_of_safety)
+    elif quality < -band and margin_of_safety <= -BUFFETT_MIN_MARGIN_OF_SAFETY:
+        signal, conviction = "bearish", min(-quality, -margin_of_safety)
+    elif abs(quality) <= BUFFETT_NEUTRAL_BAND and abs(margin_of_safety) <= BUFFETT_NEUTRAL_BAND:
+        signal, conviction = "neutral", 0.0
+    else:
+        return None
+
+    return WarrenBuffettSignal(
+        signal=signal,
+        confidence=round(50 + 50 * conviction),
+        reasoning=(
+            f"Rule-based: quality score {score}/{MAX_TOTAL_SCORE} and a margin of safety of "
+            f"{margin_of_safety:.0%} agree, making this a clear case."
+        ),
+    )
+
+
+def record_path(path: str) -> None:
+    with _stats_lock:
+        signal_stats[path] += 1
+
+
+def warren_buffett_agent(summary: FinancialSummary, history: FinancialHistory = None) -> dict:
+    """
+    Runs the Warren Buffett agent to analyze one stock, as a one-ticker `warren_buffett_agent_batch`.
+    Pipelines should pass the whole universe to the batch instead, which scores it in one pass.
+    """
+    histories = {summary.ticker: history} if history is not None else None
+    return warren_buffett_agent_batch([summary], max_workers=1, histories=histories)
+
+
+def warren_buffett_agent_batch(
+        summaries: List[FinancialSummary],
+        max_workers: int = None,
+        histories: Dict[str, FinancialHistory] = None
+        ) -> dict:
+    """
+    Runs the Warren Buffett agent on many stocks.
+    The analyzers run for every summary at once (see tools/scoring_engine.py), then the LLM
+    calls are issued in parallel (at most `max_workers`, defaults to BUFFETT_MAX_WORKERS)
+    for the tickers `rule_based_signal` leaves undecided.
+    A ticker whose LLM call fails is reported and left out; the others are unaffected.
+    `histories` maps tickers to their `FinancialHistory`; consistency, book value growth and
+    pricing power are then scored on the multi-year trends, for the rules and the LLM alike.
+    The LLM also sees the percentiles of each margin of safety over the DCF rate scenarios.
+    Returns a {ticker: signal} mapping, in the order of `summaries`.
+    """
+    print(f"Analyzing {len(summaries)} tickers with Warren Buffett agent...")
+
+    histories = histories or {}
+    table = score_universe(summaries, histories=[histories[s.ticker] for s in summaries if s.ticker in histories])
+    # Spread of each margin of safety over growth, discount and terminal rate scenarios
+    valuation = distribution_summary(sensitivity_grid(summaries))
+    signals = {}
+    prompts = {}
+    for index, summary in enumerate(summaries):
+        # The rules decide on a conservative scenario of the valuation, not the base case
+        margin_of_safety = valuation[summary.ticker]["margin_of_safety"][RULE_MOS_PERCENTILE]
+        rule_signal = rule_based_signal(table, index, margin_of_safety=margin_of_safety)
+        if rule_signal is not None:
+            record_path("rules")
+            signals[summary.ticker] = rule_signal.model_dump()
+        else:
+            record_path("llm")
+            analysis_results = analyzer_results(table, index)
+            if analysis_results["intrinsic_value"]["intrinsic_value"] is not None:
+                analysis_results["intrinsic_value"]["margin_of_safety_percentiles"] = (
+                    valuation[summary.ticker]["margin_of_safety"]
+                )
+            prompts[summary.ticker] = build_signal_messages(summary.ticker, analysis_results)
+
+    structured_llm = get_structured_llm(WarrenBuffettSignal)
+
+    def generate(ticker):
+        try:
+            return structured_llm.invoke(prompts[ticker]).model_dump()
+        except Exception as e:
+            print(f"Warren Buffett signal failed for {ticker}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max_workers or BUFFETT_MAX_WORKERS) as executor:
+        for ticker, signal in zip(prompts, executor.map(generate, prompts)):
+            if signal is not None:
+                signals[ticker] = signal
+    return {summary.ticker: signals[summary.ticker] for summary in summaries if summary.ticker in signals}
@@ -1,20 +1,135 @@
 #%%
 import os
+import json
+import hashlib
 import logging
+import threading
 from dotenv import load_dotenv
+from langchain_core.messages import AIMessage
 from langchain_google_genai import ChatGoogleGenerativeAI
 
+import replay
+from tools.api_cache import ApiCache
+
 # Silence the warning from langchain_google_genai
 logging.getLogger("langchain_google_genai").setLevel(logging.ERROR)
 
 load_dotenv()
 
-def get_llm():
-    """Initialize and return the Google Generative AI model."""
-    return ChatGoogleGenerativeAI(
-        model="gemini-2.5-flash",
-        temperature=0,
+LLM_MODEL = "gemini-2.5-flash"
+
+# Client settings (overridable through the environment / .env file)
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+
+# Response cache configuration (overridable through the environment / .env file)
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", os.path.join(".cache", "llm"))
+LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", "256"))
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+
+# Answers are stored without expiry; recorded/replayed runs go through the fixtures instead
+llm_cache = ApiCache(
+    directory=LLM_CACHE_DIR,
+    max_bytes=int(LLM_CACHE_MAX_MB * 1024 * 1024),
+    latest_ttl=0,
+    enabled=LLM_CACHE_ENABLED and replay.REPLAY_MODE == "off",
+)
+
+# Shared clients, one per model/config, built on first use
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def hash_messages(messages) -> str:
+    """Hashes a message list by type and content."""
+    raw = json.dumps([{"type": m.type, "content": m.content} for m in messages], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def hash_schema(schema) -> str:
+    """Hashes a structured-output schema, so a changed model invalidates its answers."""
+    raw = json.dumps(schema.model_json_schema(), sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class CachedLLM:
+    """
+    Serves repeated prompts from `llm_cache`.
+    With temperature 0 the same model, parameters, messages and schema give the same answer.
+    Mirrors the two methods the agents use: `invoke` and `with_structured_output`.
+    """
+
+    def __init__(self, llm, params: dict, schema=None):
+        self.llm = llm
+        self.params = params
+        self.schema = schema
+
+    def with_structured_output(self, schema):
+        return CachedLLM(self.llm.with_structured_output(schema), self.params, schema)
+
+    def invoke(self, messages):
+        params = dict(
+            self.params,
+            messages=hash_messages(messages),
+            schema=hash_schema(self.schema) if self.schema else None,
+        )
+        cached = llm_cache.get("llm", params)
+        if cached is not None:
+            if self.schema:
+                return self.schema.model_validate(cached["structured"])
+            return AIMessage(content=cached["content"])
+
+        result = self.llm.invoke(messages)
+        if self.schema:
+            llm_cache.set("llm", params, {"structured": result.model_dump()}, permanent=True)
+        else:
+            llm_cache.set("llm", params, {"content": result.content}, permanent=True)
+        return result
+
+
+def _build_llm(model: str, temperature: float, timeout: float, max_retries: int):
+    # In replay mode the answers come from the recorded fixtures, no client is needed
+    if replay.REPLAY_MODE == "replay":
+        return replay.FixtureLLM(model)
+
+    llm = ChatGoogleGenerativeAI(
+        model=model,
+        temperature=temperature,
         max_tokens=None,
-        timeout=None,
-        max_retries=2,
-    )
\ No newline at end of file
+        timeout=timeout,
+        max_retries=max_retries,
+    )
+    if replay.REPLAY_MODE == "record":
+        return replay.FixtureLLM(model, llm)
+    return llm
+
+
+def get_llm(model: str = None, temperature: float = 0, timeout: float = None, max_retries: int = None, cache: bool = True):
+    """
+    Return the shared Google Generative AI model for the given configuration.
+    The client is created once per process and reused by every agent and thread.
+    With `cache` (and temperature 0) answers are reused across runs; agents pass False to opt out.
+    """
+    key = (model or LLM_MODEL, temperature, timeout or LLM_TIMEOUT, LLM_MAX_RETRIES if max_retries is None else max_retries)
+    cached = cache and temperature == 0 and llm_cache.enabled
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = _build_llm(*key)
+        llm = _clients[key]
+        if not cached:
+            return llm
+        if ("cached",) + key not in _clients:
+            _clients[("cached",) + key] = CachedLLM(llm, {"model": key[0], "temperature": temperature})
+        return _clients[("cached",) + key]
+
+
+def get_structured_llm(schema, **config):
+    """Return the shared model bound to a structured-output schema."""
+    key = ("structured", schema, tuple(sorted(config.items())))
+    with _clients_lock:
+        structured = _clients.get(key)
+    if structured is None:
+        structured = get_llm(**config).with_structured_output(schema)
+        with _clients_lock:
+            structured = _clients.setdefault(key, structured)
+    return structured
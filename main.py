@@ -1,5 +1,6 @@
 import json
 import sys
+import threading
 import time
 from rich.console import Console
 from rich.table import Table
@@ -7,16 +8,24 @@ from rich.panel import Panel
 from rich.text import Text
 from rich.markdown import Markdown
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 
-from ai_agents.research_agent import run_research_agent
-from ai_agents.warren_buffet_agent import warren_buffett_agent
+from ai_agents.research_agent import iter_research_results, fetch_planner
+from ai_agents.research_checkpoint import ResearchCheckpoint, checkpoint_path
+from ai_agents.screener import screen_universe
+from ai_agents.warren_buffet_agent import warren_buffett_agent_batch, BUFFETT_BATCH_SIZE, signal_stats
 from ai_agents.portfolio_and_risk_manager import run_portfolio_manager_agent
 from ai_agents.what_if_agent import run_what_if_agent
 from ai_agents.final_orchestrator_agent import run_final_orchestrator_agent, generate_ascii_chart
 from ai_agents.monitor import run_monitor_agent
 from models.tickers import TICKERS
+from llm import get_llm, llm_cache
 from models.financial_summary import FinancialSummary
-from tools.get_stock_prices import get_stock_prices
+from models.summary_table import FinancialSummaryTable
+from tools.api_cache import api_cache
+from tools.rate_limiter import rate_limiter
+from tools.universe_snapshot import snapshot_path, save_snapshot, open_snapshot
+from tools.get_stock_prices import latest_close
 
 console = Console()
 
@@ -33,22 +42,13 @@ def generate_portfolio_allocation(capital: float, trading_date: str = None):
     
     for ticker in tickers:
         try:
-            # Use .func to call the tool directly if available, otherwise call as callable
-            kwargs = {"ticker": ticker}
-            if trading_date:
-                kwargs["end_date"] = trading_date
-                # Set start_date to a week before to ensure we get data
-                dt = datetime.strptime(trading_date, '%Y-%m-%d')
-                kwargs["start_date"] = (dt - timedelta(days=7)).strftime('%Y-%m-%d')
-
-            price_data = get_stock_prices.func(**kwargs) if hasattr(get_stock_prices, 'func') else get_stock_prices(**kwargs)
-            
-            if price_data and 'prices' in price_data and price_data['prices']:
-                price = price_data['prices'][-1].get('close', 0)
-                if price > 0:
-                    shares = int(per_stock_capital // price)
-                    if shares > 0:
-                        portfolio[ticker] = shares
+            # Last close on or before the trading date, read from the local price store
+            price = latest_close(ticker, trading_date)
+
+            if price and price > 0:
+                shares = int(per_stock_capital // price)
+                if shares > 0:
+                    portfolio[ticker] = shares
         except Exception as e:
             console.print(f"Error fetching price for {ticker}: {e}", style="red")
     
@@ -178,6 +178,87 @@ def get_backtesting_date():
                 console.print("Invalid date format. Please use YYYY-MM-DD.")
     return None
 
+def analyze_universe(tickers_to_research: list, backtesting_date: str, portfolio: dict, force_refresh: bool):
+    """
+    Researches the tickers and runs the Warren Buffett analysis on them.
+    Returns the financial summaries and the Buffett signals, by ticker.
+    """
+    # Keyed on the universe before the screen, whose ranking can change between a run and its resume
+    research_checkpoint = checkpoint_path(tickers_to_research, backtesting_date)
+
+    # Deterministic pre-screen: only the best ranked tickers and the holdings reach the LLM stages
+    tickers_to_research, screened_line_items = screen_universe(
+        tickers_to_research, backtesting_date, holdings=portfolio.keys()
+    )
+
+    console.print(f"Researching {len(tickers_to_research)} tickers...")
+    if force_refresh:
+        ResearchCheckpoint(research_checkpoint).clear()
+    # 1-2. Research feeds the Warren Buffett Agent in batches: each batch is scored in one pass and
+    # its LLM calls run in parallel (one batch at a time) while the research of the next goes on
+    console.print("\n--- Running Warren Buffett Analysis ---", style="bold yellow")
+    research_results = {}
+    histories = {}
+    warren_buffett_signals = {}
+    with ThreadPoolExecutor(max_workers=1) as buffett_executor:
+        buffett_batches = []
+        batch = []
+        for ticker, result, errors in iter_research_results(
+                tickers_to_research,
+                backtesting_date,
+                force_refresh=force_refresh,
+                checkpoint_path=research_checkpoint,
+                line_items=screened_line_items,
+                history_sink=histories):
+            if result is None:
+                console.print(f"  - {ticker}: Research failed.")
+                continue
+            research_results[ticker] = result
+            batch.append(result.financial_summary)
+            if len(batch) >= BUFFETT_BATCH_SIZE:
+                buffett_batches.append((batch, buffett_executor.submit(warren_buffett_agent_batch, batch, None, histories)))
+                batch = []
+        if batch:
+            buffett_batches.append((batch, buffett_executor.submit(warren_buffett_agent_batch, batch, None, histories)))
+
+        for batch, future in buffett_batches:
+            try:
+                signal_data = future.result()
+            except Exception as e:
+                signal_data = {}
+                console.print(f"  - Analysis failed for {', '.join(s.ticker for s in batch)}: {e}")
+            for summary in batch:
+                ticker = summary.ticker
+                if ticker in signal_data:
+                    warren_buffett_signals[ticker] = signal_data[ticker]
+                    reasoning = signal_data[ticker].get('reasoning', 'No reasoning provided.')
+                    signal = signal_data[ticker].get('signal', 'neutral')
+                    confidence = signal_data[ticker].get('confidence', 0)
+                    console.print(f"  - {ticker}: {signal.upper()} (Confidence: {confidence}%) - {reasoning}")
+                else:
+                    console.print(f"  - {ticker}: Could not get analysis.")
+
+    # Keep the requested ticker order for the later stages
+    financial_data = {
+        ticker: research_results[ticker].financial_summary
+        for ticker in tickers_to_research if ticker in research_results
+    }
+    warren_buffett_signals = {
+        ticker: warren_buffett_signals[ticker]
+        for ticker in tickers_to_research if ticker in warren_buffett_signals
+    }
+    console.print("Research complete.")
+
+    total_signals = sum(signal_stats.values())
+    if total_signals:
+        console.print(
+            f"Buffett signals: {signal_stats['rules']} rule-based ({signal_stats['rules'] / total_signals:.0%}), "
+            f"{signal_stats['llm']} via LLM ({signal_stats['llm'] / total_signals:.0%})"
+        )
+    console.print("Warren Buffett analysis complete.")
+
+    return financial_data, warren_buffett_signals
+
 def main():
     """
     Main function to run the financial agent.
@@ -188,9 +269,18 @@ def main():
     # Check for debug mode
     debug_mode = "--debug" in sys.argv
 
+    # Re-research every ticker even if its inputs have not changed
+    force_refresh = "--refresh" in sys.argv
+
+    # Start from the stored snapshot of the as-of date instead of researching again
+    from_snapshot = "--from-snapshot" in sys.argv
+
     # Enable recording to save log later
     console.record = True
 
+    # Build the shared LLM client in the background while the user answers the prompts
+    threading.Thread(target=get_llm, daemon=True).start()
+
     console.print("--- Welcome to the Financial Agent ---", style="bold green")
     
     if debug_mode:
@@ -206,39 +296,45 @@ def main():
         backtesting_date = get_backtesting_date()
 
     console.print("\n--- Starting Financial Analysis ---", style="bold green")
-    
+
     if debug_mode:
         tickers_to_research = ["AAPL", "MSFT", "NVDA"]
     else:
         tickers_to_research = get_tickers_to_research()
 
-    console.print(f"Researching {len(tickers_to_research)} tickers...")
-    research_output_json = run_research_agent(tickers_to_research, backtesting_date)
-    research_output = json.loads(research_output_json)
-    financial_data = {res['financial_summary']['ticker']: FinancialSummary(**res['financial_summary']) for res in research_output.get('results', [])}
-    console.print("Research complete.")
-
-    # 2. Warren Buffett Agent (Run once)
-    console.print("\n--- Running Warren Buffett Analysis ---", style="bold yellow")
-    warren_buffett_signals = {}
-    for ticker, summary in financial_data.items():
-        signal_data = warren_buffett_agent(summary)
-        if signal_data and ticker in signal_data:
-            warren_buffett_signals.update(signal_data)
-            reasoning = signal_data[ticker].get('reasoning', 'No reasoning provided.')
-            signal = signal_data[ticker].get('signal', 'neutral')
-            confidence = signal_data[ticker].get('confidence', 0)
-            console.print(f"  - {ticker}: {signal.upper()} (Confidence: {confidence}%) - {reasoning}")
-        else:
-            console.print(f"  - {ticker}: Could not get analysis.")
-    console.print("Warren Buffett analysis complete.")
+    # Reuse the research and signals stored for this universe and as-of date (intraday reruns)
+    snapshot_file = snapshot_path(tickers_to_research, backtesting_date, debug_mode)
+    snapshot = open_snapshot(snapshot_file) if from_snapshot else None
+    if snapshot is not None:
+        # The later agents need a price for every holding
+        missing_holdings = [ticker for ticker in portfolio if ticker not in snapshot.price_map]
+        if missing_holdings:
+            console.print(f"Snapshot has no data for holdings {', '.join(missing_holdings)}.")
+            snapshot = None
+    if snapshot is not None:
+        console.print(f"Loaded snapshot {snapshot_file} ({len(snapshot.tickers)} tickers), skipping research.")
+        warren_buffett_signals = snapshot.signals
+        price_map = snapshot.price_map
+    else:
+        if from_snapshot:
+            console.print("No usable snapshot for this run, running the full analysis.")
+        financial_data, warren_buffett_signals = analyze_universe(
+            tickers_to_research, backtesting_date, portfolio, force_refresh
+        )
 
-    # Build Price Map from Financial Data
-    # Prices are now fetched by the research agent and stored in FinancialSummary
-    price_map = {
-        ticker: data.price if data.price else 0.0 
-        for ticker, data in financial_data.items()
-    }
+        # Build Price Map from Financial Data
+        # Prices are now fetched by the research agent and stored in FinancialSummary
+        price_map = {
+            ticker: data.price if data.price else 0.0
+            for ticker, data in financial_data.items()
+        }
+        save_snapshot(
+            snapshot_file,
+            FinancialSummaryTable.from_summaries(financial_data.values()),
+            warren_buffett_signals,
+            price_map,
+            backtesting_date
+        )
     
     # Display Configuration with Prices
     console.print("\n--- Your Configuration ---", style="bold green")
@@ -377,23 +473,16 @@ def main():
             # current price via get_stock_prices tool
             price_now = 0
             try:
-                # get current price, no date filter implied today
-                current_data = get_stock_prices.func(ticker=ticker)
-                
+                # latest close from the local price store, only the missing days are fetched
+                price_now = latest_close(ticker)
+                if price_now is None:
+                    console.print(f"[yellow]No price list found for {ticker}[/yellow]")
+                    price_now = 0
+
+            except ValueError as e:
                 # Check for API errors
-                if "error" in current_data:
-                    console.print(f"[red]API Error for {ticker}: {current_data['error']}[/red]")
-                else:
-                    # Extract the list of prices
-                    prices_list = current_data.get('prices', [])
-                    
-                    if prices_list and isinstance(prices_list, list):
-                        # Take the last element (most recent)
-                        last_candle = prices_list[-1]
-                        price_now = last_candle.get('close', 0)
-                    else:
-                        console.print(f"[yellow]No price list found for {ticker}[/yellow]")
-            
+                console.print(f"[red]API Error for {ticker}: {e}[/red]")
+                price_now = 0
             except Exception as e:
                 console.print(f"[red]Error fetching current price for {ticker}: {e}[/red]")
                 price_now = 0
@@ -442,6 +531,30 @@ def main():
     elapsed_time = end_time - start_time
     console.print(f"\n[bold]Total Execution Time:[/bold] {elapsed_time:.2f} seconds")
 
+    cache_stats = api_cache.stats()
+    console.print(
+        f"[bold]API Cache:[/bold] {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+        f"({cache_stats['hit_rate']:.0%} hit rate)"
+    )
+
+    llm_stats = llm_cache.stats()
+    console.print(
+        f"[bold]LLM Cache:[/bold] {llm_stats['hits']} hits, {llm_stats['misses']} misses "
+        f"({llm_stats['hit_rate']:.0%} hit rate)"
+    )
+
+    planner_stats = fetch_planner.stats()
+    console.print(
+        f"[bold]Fetch Plan:[/bold] {', '.join(planner_stats['plan'])} "
+        f"({planner_stats['calls']} calls, {planner_stats['coalesced']} reused)"
+    )
+
+    limiter_stats = rate_limiter.stats()
+    console.print(
+        f"[bold]API Requests:[/bold] {limiter_stats['requests']} sent, {limiter_stats['throttled']} throttled, "
+        f"{limiter_stats['throttle_wait_seconds']:.2f}s waiting on the rate limiter"
+    )
+
     # Save Log
     console.save_text("financial_agent_session.txt")
     console.print("\n[dim]Session log saved to 'financial_agent_session.txt'[/dim]")
@@ -449,5 +562,7 @@ def main():
 if __name__ == "__main__":
     try:
         main()
+    except KeyboardInterrupt:
+        console.print("\nInterrupted. Research progress is checkpointed, run again to resume.", style="bold yellow")
     except Exception as e:
         console.print(f"An error occurred: {e}", style="bold red")
@@ -0,0 +1,43 @@
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Dict, List
+
+import numpy as np
+
+
+class FinancialHistory(BaseModel):
+    """
+    Per-period history of a ticker's line items.
+    `periods` are the report periods, oldest first; `values` holds one float64 array per
+    line item, aligned with `periods` (NaN where a period lacks the item).
+    """
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    ticker: str
+    periods: List[str] = Field(default_factory=list)
+    values: Dict[str, np.ndarray] = Field(default_factory=dict)
+
+    def series(self, field: str) -> np.ndarray:
+        """Returns the array of a line item (all NaN if it was never reported)."""
+        if field in self.values:
+            return self.values[field]
+        return np.full(len(self.periods), np.nan)
+
+    def to_record(self) -> dict:
+        """JSON-serializable form (NaN as None), e.g. for the research checkpoint."""
+        return {
+            "ticker": self.ticker,
+            "periods": list(self.periods),
+            "values": {
+                field: [None if np.isnan(value) else float(value) for value in array]
+                for field, array in self.values.items()
+            },
+        }
+
+    @classmethod
+    def from_record(cls, record: dict) -> "FinancialHistory":
+        """Rebuilds a history from `to_record` output (None becomes NaN)."""
+        return cls(
+            ticker=record["ticker"],
+            periods=record["periods"],
+            values={field: np.array(values, dtype=np.float64) for field, values in record["values"].items()},
+        )
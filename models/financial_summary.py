@@ -63,10 +63,10 @@ class FinancialSummary(BaseModel):
     current_liabilities: Optional[float] = None
 
 class ToolStatus(BaseModel):
-    get_financials: Literal["ok", "error"]
-    get_metrics: Literal["ok", "error"]
-    get_financial_line_items: Literal["ok", "error"]
-    get_stock_prices: Literal["ok", "error"]
+    get_financials: Literal["ok", "error", "skipped"]
+    get_metrics: Literal["ok", "error", "skipped"]
+    get_financial_line_items: Literal["ok", "error", "skipped"]
+    get_stock_prices: Literal["ok", "error", "skipped"]
 
 class Error(BaseModel):
     tool: str
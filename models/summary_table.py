@@ -0,0 +1,114 @@
+from typing import Dict, Iterable, Iterator, List
+
+import numpy as np
+
+from models.financial_summary import FinancialSummary
+
+# Numeric fields of FinancialSummary, in declaration order
+SUMMARY_FIELDS = [name for name in FinancialSummary.model_fields if name != "ticker"]
+FIELD_INDEX = {name: i for i, name in enumerate(SUMMARY_FIELDS)}
+
+
+class SummaryRow:
+    """
+    Read-only view of one row of a `FinancialSummaryTable`.
+    Exposes the same attributes as `FinancialSummary` (None for missing values), so it can be
+    passed to the analyzer tools without building a pydantic model.
+    """
+    __slots__ = ("_table", "_index")
+
+    def __init__(self, table: "FinancialSummaryTable", index: int):
+        self._table = table
+        self._index = index
+
+    @property
+    def ticker(self) -> str:
+        return str(self._table.tickers[self._index])
+
+    def __getattr__(self, name: str):
+        j = FIELD_INDEX.get(name)
+        if j is None:
+            raise AttributeError(name)
+        if self._table.missing[j, self._index]:
+            return None
+        return float(self._table.values[j, self._index])
+
+    def model_dump(self) -> dict:
+        return self._table.summary(self._index).model_dump()
+
+    def __repr__(self) -> str:
+        return f"SummaryRow(ticker={self.ticker!r})"
+
+
+class FinancialSummaryTable:
+    """
+    Struct-of-arrays container for many `FinancialSummary` records.
+
+    `values` is a (fields x tickers) float64 matrix, so each field is one contiguous column;
+    `missing` is the matching boolean mask (missing values are also NaN in `values`).
+    """
+
+    def __init__(self, tickers, values: np.ndarray, missing: np.ndarray = None):
+        self.tickers = np.asarray(tickers, dtype=object)
+        self.values = values
+        self.missing = np.isnan(values) if missing is None else missing
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict]) -> "FinancialSummaryTable":
+        """Builds a table from summary dicts (e.g. `model_dump()` output) without validating them."""
+        records = list(records)
+        values = np.empty((len(SUMMARY_FIELDS), len(records)))
+        for j, field in enumerate(SUMMARY_FIELDS):
+            # NumPy turns None into NaN for float arrays
+            values[j] = np.array([record.get(field) for record in records], dtype=np.float64)
+        return cls([record["ticker"] for record in records], values)
+
+    @classmethod
+    def from_summaries(cls, summaries: Iterable[FinancialSummary]) -> "FinancialSummaryTable":
+        """Builds a table from already validated summaries."""
+        return cls.from_records(summary.__dict__ for summary in summaries)
+
+    def __len__(self) -> int:
+        return len(self.tickers)
+
+    def __getitem__(self, index: int) -> SummaryRow:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return SummaryRow(self, index)
+
+    def __iter__(self) -> Iterator[SummaryRow]:
+        return (SummaryRow(self, i) for i in range(len(self)))
+
+    def column(self, field: str) -> np.ndarray:
+        """Returns a field as a float64 array (a view, NaN for missing values)."""
+        return self.values[FIELD_INDEX[field]]
+
+    def columns(self, fields: List[str] = None) -> Dict[str, np.ndarray]:
+        """Returns the ticker column and the requested field columns, as the scoring engine expects."""
+        columns = {"ticker": self.tickers}
+        for field in fields or SUMMARY_FIELDS:
+            columns[field] = self.column(field)
+        return columns
+
+    def filter(self, mask: np.ndarray) -> "FinancialSummaryTable":
+        """Returns the rows where `mask` is True, e.g. `table.filter(table.column("price") > 10)`."""
+        mask = np.asarray(mask)
+        return FinancialSummaryTable(self.tickers[mask], self.values[:, mask], self.missing[:, mask])
+
+    def select(self, tickers: Iterable[str]) -> "FinancialSummaryTable":
+        """Returns the rows of the given tickers, in that order (unknown tickers are skipped)."""
+        position = {ticker: i for i, ticker in enumerate(self.tickers)}
+        return self.filter(np.array([position[t] for t in tickers if t in position], dtype=np.int64))
+
+    def summary(self, index: int) -> FinancialSummary:
+        """Builds the `FinancialSummary` of one row on the trusted path (no re-validation)."""
+        fields = {
+            field: None if self.missing[j, index] else float(self.values[j, index])
+            for j, field in enumerate(SUMMARY_FIELDS)
+        }
+        return FinancialSummary.model_construct(ticker=str(self.tickers[index]), **fields)
+
+    def to_summaries(self) -> List[FinancialSummary]:
+        return [self.summary(i) for i in range(len(self))]
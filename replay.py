@@ -0,0 +1,190 @@
+"""
+Record/replay support for running the pipeline without the live data API and LLM.
+
+- REPLAY_MODE=record: every financialdatasets.ai exchange and every LLM call is saved to REPLAY_DIR.
+- REPLAY_MODE=replay: the data tools talk to a local stand-in server serving the recorded
+  exchanges, and the LLM answers come from the fixtures, both with REPLAY_LATENCY_MS of
+  injected latency. No FINDAT_API_KEY or Gemini key is needed.
+
+Cached responses never reach the network, so record with FINDAT_CACHE_ENABLED=false and an
+empty PRICE_STORE_DIR to capture every request the run makes.
+
+The stand-in server can also be started on its own:
+    python replay.py --port 8765 --latency-ms 50
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl
+from dotenv import load_dotenv
+from langchain_core.messages import AIMessage
+
+load_dotenv()
+
+REPLAY_MODE = os.getenv("REPLAY_MODE", "off").lower()
+REPLAY_DIR = os.getenv("REPLAY_DIR", "fixtures")
+REPLAY_LATENCY_MS = float(os.getenv("REPLAY_LATENCY_MS", "0"))
+REPLAY_LLM_LATENCY_MS = float(os.getenv("REPLAY_LLM_LATENCY_MS", str(REPLAY_LATENCY_MS)))
+
+# The tools refuse to run without an API key; the stand-in server does not need one
+if REPLAY_MODE == "replay" and not os.getenv("FINDAT_API_KEY"):
+    os.environ["FINDAT_API_KEY"] = "replay"
+
+
+class FixtureStore:
+    """Stores recorded responses as JSON files, one per request, keyed by a hash of the request."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    @staticmethod
+    def make_key(request: dict) -> str:
+        raw = json.dumps(request, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, kind: str, request: dict) -> str:
+        return os.path.join(self.directory, kind, f"{self.make_key(request)}.json")
+
+    def save(self, kind: str, request: dict, response: dict) -> None:
+        path = self._path(kind, request)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"request": request, "response": response}, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def load(self, kind: str, request: dict):
+        try:
+            with open(self._path(kind, request), "r", encoding="utf-8") as f:
+                return json.load(f)["response"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+
+fixture_store = FixtureStore(REPLAY_DIR)
+
+
+def http_request_key(method: str, path: str, params: dict = None, payload: dict = None) -> dict:
+    """Normalizes an API request so the client and the stand-in server agree on its key."""
+    return {
+        "method": method.upper(),
+        "path": path,
+        "params": {k: str(v) for k, v in (params or {}).items() if v is not None},
+        "json": payload,
+    }
+
+
+def record_http(method: str, path: str, params: dict, payload: dict, response) -> None:
+    """Saves one API exchange (called by the HTTP client in record mode)."""
+    fixture_store.save(
+        "http",
+        http_request_key(method, path, params, payload),
+        {"status": response.status_code, "body": response.text},
+    )
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    """Serves recorded API exchanges, standing in for financialdatasets.ai."""
+
+    latency_ms = REPLAY_LATENCY_MS
+
+    def _serve(self, payload: dict = None) -> None:
+        url = urlsplit(self.path)
+        request = http_request_key(self.command, url.path, dict(parse_qsl(url.query)), payload)
+        response = fixture_store.load("http", request)
+        if response is None:
+            response = {"status": 404, "body": json.dumps({"error": f"No fixture recorded for {self.command} {self.path}"})}
+
+        time.sleep(self.latency_ms / 1000)
+        body = response["body"].encode("utf-8")
+        self.send_response(response["status"])
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._serve()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self._serve(json.loads(self.rfile.read(length) or b"null"))
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_replay_server(port: int = 0, latency_ms: float = None) -> str:
+    """Starts the stand-in server in a background thread (once) and returns its base URL."""
+    global _server
+    with _server_lock:
+        if _server is None:
+            if latency_ms is not None:
+                ReplayHandler.latency_ms = latency_ms
+            _server = ThreadingHTTPServer(("127.0.0.1", port), ReplayHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{_server.server_port}"
+
+
+class FixtureLLM:
+    """
+    Wraps a chat model (or stands in for one) in record/replay mode.
+    Mirrors the two methods the agents use: `invoke` and `with_structured_output`.
+    """
+
+    def __init__(self, model: str, llm=None, schema=None):
+        self.model = model
+        self.llm = llm
+        self.schema = schema
+
+    def with_structured_output(self, schema):
+        structured = self.llm.with_structured_output(schema) if self.llm is not None else None
+        return FixtureLLM(self.model, structured, schema)
+
+    def invoke(self, messages):
+        request = {
+            "model": self.model,
+            "schema": self.schema.__name__ if self.schema else None,
+            "messages": [{"type": m.type, "content": m.content} for m in messages],
+        }
+
+        if REPLAY_MODE == "replay":
+            response = fixture_store.load("llm", request)
+            if response is None:
+                raise LookupError(f"No LLM fixture recorded for this prompt ({FixtureStore.make_key(request)[:12]})")
+            time.sleep(REPLAY_LLM_LATENCY_MS / 1000)
+            if self.schema:
+                return self.schema.model_validate(response["structured"])
+            return AIMessage(content=response["content"])
+
+        result = self.llm.invoke(messages)
+        if self.schema:
+            fixture_store.save("llm", request, {"structured": result.model_dump()})
+        else:
+            fixture_store.save("llm", request, {"content": result.content})
+        return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve recorded financialdatasets.ai fixtures locally.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=REPLAY_LATENCY_MS)
+    args = parser.parse_args()
+
+    url = start_replay_server(args.port, args.latency_ms)
+    print(f"Serving fixtures from '{REPLAY_DIR}' at {url} (set FINDAT_BASE_URL to use it)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        sys.exit(0)
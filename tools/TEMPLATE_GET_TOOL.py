@@ -1,8 +1,9 @@
 import os
-import requests
 from dotenv import load_dotenv
 from langchain.tools import tool
 
+from tools.api_client import api_get
+
 load_dotenv()
 
 FINDAT_API_KEY = os.getenv("FINDAT_API_KEY")
@@ -58,14 +59,8 @@ def get_metrics(ticker: str, period: str = 'ttm', limit: int = 30) -> dict:
         "X-API-KEY": FINDAT_API_KEY
     }
 
-    # create the URL
-    url = (
-        f'https://api.financialdatasets.ai/financial-metrics/snapshot'
-        f'?ticker={ticker}'
-    )
-
     # make API request
-    response = requests.get(url, headers=headers)
+    response = api_get("/financial-metrics/snapshot", params={"ticker": ticker}, headers=headers)
 
     # if status code is 400, 401, 402 or 404 return error message
     if response.status_code != 200:
@@ -0,0 +1,153 @@
+"""
+Multi-year trend analyzers over `FinancialHistory` arrays.
+
+Counterparts of `analyze_consistency`, `analyze_book_value_growth` and `analyze_pricing_power`
+that look at every reported period instead of a single scalar. All tickers are stacked
+into one (tickers x periods) matrix per line item and analyzed in a single pass.
+"""
+import warnings
+from typing import Dict, List
+
+import numpy as np
+
+from models.financial_history import FinancialHistory
+
+# Thresholds of the trend rules
+EARNINGS_CAGR_THRESHOLD = 0.05
+BOOK_VALUE_CAGR_THRESHOLD = 0.1
+GROSS_MARGIN_THRESHOLD = 0.4
+GROSS_MARGIN_STABILITY = 0.02
+MIN_PERIODS = 3
+
+# Components scored from the trends, each with the same maximum score as its scalar analyzer
+TREND_COMPONENTS = ("consistency", "book_value_growth", "pricing_power")
+
+
+def stack_histories(histories: List[FinancialHistory], field: str) -> np.ndarray:
+    """
+    Stacks one line item of every history into a (tickers x periods) matrix.
+    Rows are aligned on the latest period and padded with NaN on the left.
+    """
+    width = max((len(h.periods) for h in histories), default=0)
+    matrix = np.full((len(histories), width), np.nan)
+    for i, history in enumerate(histories):
+        series = history.series(field)
+        if len(series):
+            matrix[i, width - len(series):] = series
+    return matrix
+
+
+def cagr(matrix: np.ndarray) -> np.ndarray:
+    """
+    Compound annual growth rate between the first and last reported value of each row
+    (one period per year). NaN with fewer than two values or a non-positive endpoint.
+    """
+    rows, width = matrix.shape
+    if width == 0:
+        return np.full(rows, np.nan)
+    reported = np.isfinite(matrix)
+    first = np.argmax(reported, axis=1)
+    last = width - 1 - np.argmax(reported[:, ::-1], axis=1)
+    start = matrix[np.arange(rows), first]
+    end = matrix[np.arange(rows), last]
+    years = (last - first).astype(np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = (end / start) ** (1 / years) - 1
+    return np.where((years >= 1) & (start > 0) & (end > 0), growth, np.nan)
+
+
+def growth_variance(matrix: np.ndarray) -> np.ndarray:
+    """Variance of the year-over-year growth rates of each row (NaN with fewer than two)."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        yoy = np.diff(matrix, axis=1) / np.abs(matrix[:, :-1])
+    yoy[~np.isfinite(yoy)] = np.nan
+    return nan_reduce(np.nanvar, yoy, min_count=2)
+
+
+def nan_reduce(func, matrix: np.ndarray, min_count: int = 1) -> np.ndarray:
+    """Applies a NaN-aware reduction per row, NaN for rows with fewer than `min_count` values."""
+    if matrix.shape[1] == 0:
+        return np.full(matrix.shape[0], np.nan)
+    with warnings.catch_warnings():
+        # Rows without values warn and give NaN, which is what we want
+        warnings.simplefilter("ignore", RuntimeWarning)
+        reduced = func(matrix, axis=1)
+    return np.where(np.isfinite(matrix).sum(axis=1) >= min_count, reduced, np.nan)
+
+
+def optional(value: float):
+    return None if np.isnan(value) else float(value)
+
+
+def analyze_trends(histories: List[FinancialHistory]) -> Dict[str, dict]:
+    """
+    Scores the multi-year consistency, book value growth and pricing power of every history.
+    Returns {ticker: {"consistency": {...}, "book_value_growth": {...}, "pricing_power": {...}}},
+    each with a "score", "details", the number of "periods" it was based on and the trend figures.
+    """
+    net_income = stack_histories(histories, "net_income")
+    revenue = stack_histories(histories, "revenue")
+    gross_profit = stack_histories(histories, "gross_profit")
+    equity = stack_histories(histories, "shareholders_equity")
+    shares = stack_histories(histories, "outstanding_shares")
+
+    periods = np.isfinite(net_income).sum(axis=1)
+    always_profitable = (periods >= MIN_PERIODS) & ~np.any(net_income <= 0, axis=1)
+    earnings_cagr = cagr(net_income)
+    earnings_variance = growth_variance(net_income)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        book_value_per_share = equity / np.where(shares > 0, shares, np.nan)
+        gross_margin = gross_profit / np.where(revenue > 0, revenue, np.nan)
+    book_value_cagr = cagr(book_value_per_share)
+    book_value_periods = np.isfinite(book_value_per_share).sum(axis=1)
+    margin_periods = np.isfinite(gross_margin).sum(axis=1)
+    margin_mean = nan_reduce(np.nanmean, gross_margin)
+    margin_std = nan_reduce(np.nanstd, gross_margin, min_count=MIN_PERIODS)
+
+    trends = {}
+    for i, history in enumerate(histories):
+        consistency, consistency_score = [], 0
+        if always_profitable[i]:
+            consistency_score += 1
+            consistency.append(f"Profitable in each of the last {periods[i]} years.")
+        if earnings_cagr[i] > EARNINGS_CAGR_THRESHOLD:
+            consistency_score += 2
+            consistency.append(f"Earnings grew {earnings_cagr[i]:.1%} a year.")
+
+        book_value, book_value_score = [], 0
+        if book_value_cagr[i] > BOOK_VALUE_CAGR_THRESHOLD:
+            book_value_score += 2
+            book_value.append(f"Book value per share grew {book_value_cagr[i]:.1%} a year.")
+
+        pricing, pricing_score = [], 0
+        if margin_mean[i] > GROSS_MARGIN_THRESHOLD:
+            pricing_score += 1
+            pricing.append(f"Average gross margin of {margin_mean[i]:.1%}.")
+        if margin_std[i] < GROSS_MARGIN_STABILITY:
+            pricing_score += 1
+            pricing.append(f"Stable gross margin (std {margin_std[i]:.1%}).")
+
+        trends[history.ticker] = {
+            "consistency": {
+                "score": consistency_score,
+                "details": "; ".join(consistency),
+                "periods": int(periods[i]),
+                "earnings_cagr": optional(earnings_cagr[i]),
+                "earnings_growth_variance": optional(earnings_variance[i]),
+            },
+            "book_value_growth": {
+                "score": book_value_score,
+                "details": "; ".join(book_value),
+                "periods": int(book_value_periods[i]),
+                "book_value_per_share_cagr": optional(book_value_cagr[i]),
+            },
+            "pricing_power": {
+                "score": pricing_score,
+                "details": "; ".join(pricing),
+                "periods": int(margin_periods[i]),
+                "gross_margin_mean": optional(margin_mean[i]),
+                "gross_margin_std": optional(margin_std[i]),
+            },
+        }
+    return trends
@@ -0,0 +1,177 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from datetime import datetime
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Cache configuration (overridable through the environment / .env file)
+CACHE_DIR = os.getenv("FINDAT_CACHE_DIR", os.path.join(".cache", "findat"))
+CACHE_MAX_MB = float(os.getenv("FINDAT_CACHE_MAX_MB", "512"))
+CACHE_LATEST_TTL = int(os.getenv("FINDAT_CACHE_LATEST_TTL", str(6 * 60 * 60)))
+CACHE_ENABLED = os.getenv("FINDAT_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+
+
+class ApiCache:
+    """
+    Persistent on-disk cache for financialdatasets.ai responses.
+
+    Entries are keyed by endpoint plus the normalized request parameters.
+    Point-in-time queries (an `end_date` in the past) can never change, so they are
+    stored without expiry; "latest" queries expire after `latest_ttl` seconds.
+    When the cache grows past `max_bytes` the least recently used entries are evicted.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, latest_ttl: int, enabled: bool = True):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.latest_ttl = latest_ttl
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._total_bytes = None
+
+    @staticmethod
+    def make_key(endpoint: str, params: dict) -> str:
+        """Builds a stable key from the endpoint and its parameters (None values are dropped)."""
+        normalized = {k: v for k, v in params.items() if v is not None}
+        raw = json.dumps({"endpoint": endpoint, "params": normalized}, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def is_historical(end_date: str = None) -> bool:
+        """An as-of query is historical when its end_date lies strictly before today."""
+        if not end_date:
+            return False
+        return end_date < datetime.now().strftime('%Y-%m-%d')
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, endpoint: str, params: dict):
+        """Returns the cached payload, or None on a miss or an expired entry."""
+        if not self.enabled:
+            return None
+
+        path = self._path(self.make_key(endpoint, params))
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        expires_at = entry.get("expires_at")
+        if expires_at is not None and expires_at < time.time():
+            self._remove(path)
+            with self._lock:
+                self.misses += 1
+            return None
+
+        # Touch the file so eviction treats it as recently used
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+        with self._lock:
+            self.hits += 1
+        return entry.get("data")
+
+    def set(self, endpoint: str, params: dict, data, end_date: str = None, permanent: bool = False) -> None:
+        """Stores a payload. Historical as-of entries (or `permanent` ones) never expire, the rest get a TTL."""
+        if not self.enabled:
+            return
+
+        entry = {
+            "endpoint": endpoint,
+            "stored_at": time.time(),
+            "expires_at": None if permanent or self.is_historical(end_date) else time.time() + self.latest_ttl,
+            "data": data,
+        }
+        path = self._path(self.make_key(endpoint, params))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a temporary file first so concurrent readers never see a partial entry
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        old_size = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes += os.path.getsize(path) - old_size
+        self._evict_if_needed()
+
+    def _remove(self, path: str) -> None:
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes -= size
+
+    def _entries(self) -> list:
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict_if_needed(self) -> None:
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, size, _ in self._entries())
+            if self._total_bytes <= self.max_bytes:
+                return
+
+            # Drop least recently used entries until we are back under 90% of the budget
+            target = self.max_bytes * 0.9
+            for _, size, path in sorted(self._entries()):
+                if self._total_bytes <= target:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                self._total_bytes -= size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Removes every cached entry."""
+        for _, _, path in self._entries():
+            self._remove(path)
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters for the current process."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+# Shared cache instance used by all the financialdatasets.ai tools
+api_cache = ApiCache(
+    directory=CACHE_DIR,
+    max_bytes=int(CACHE_MAX_MB * 1024 * 1024),
+    latest_ttl=CACHE_LATEST_TTL,
+    enabled=CACHE_ENABLED,
+)
@@ -0,0 +1,130 @@
+import os
+import time
+import random
+import threading
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import replay
+from tools.rate_limiter import rate_limiter, parse_retry_after
+
+load_dotenv()
+
+# HTTP client configuration (overridable through the environment / .env file)
+BASE_URL = os.getenv("FINDAT_BASE_URL", "https://api.financialdatasets.ai")
+if replay.REPLAY_MODE == "replay" and not os.getenv("FINDAT_BASE_URL"):
+    # Serve the recorded exchanges from the local stand-in server
+    BASE_URL = replay.start_replay_server()
+POOL_SIZE = int(os.getenv("FINDAT_POOL_SIZE", "32"))
+CONNECT_TIMEOUT = float(os.getenv("FINDAT_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("FINDAT_READ_TIMEOUT", "30"))
+MAX_RETRIES = int(os.getenv("FINDAT_MAX_RETRIES", "3"))
+BACKOFF_FACTOR = float(os.getenv("FINDAT_BACKOFF_FACTOR", "0.5"))
+THROTTLE_RETRIES = int(os.getenv("FINDAT_THROTTLE_RETRIES", "8"))
+
+_session = None
+_session_lock = threading.Lock()
+
+# Endpoints whose server-side as-of filter has already been compared with the client-side one
+_checked_filters = set()
+_checked_filters_lock = threading.Lock()
+
+
+def build_session(pool_size: int = POOL_SIZE) -> requests.Session:
+    """
+    Creates a keep-alive session with a bounded connection pool.
+    Requests are retried on 5xx with jittered exponential backoff; 429s are left to
+    `send_request` so the shared rate limiter can see them.
+    """
+    retry = Retry(
+        total=MAX_RETRIES,
+        connect=MAX_RETRIES,
+        read=MAX_RETRIES,
+        status=MAX_RETRIES,
+        backoff_factor=BACKOFF_FACTOR,
+        backoff_jitter=BACKOFF_FACTOR,
+        status_forcelist=(500, 502, 503, 504),
+        # The line-items search is a read-only POST, so it is safe to retry as well
+        allowed_methods=frozenset({"GET", "POST"}),
+        # urllib3 would otherwise retry 429s itself whenever Retry-After is present
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept-Encoding": "gzip, deflate", "Accept": "application/json"})
+    return session
+
+
+def get_session() -> requests.Session:
+    """Returns the process-wide session shared by all the data tools."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = build_session()
+    return _session
+
+
+def send_request(method: str, path: str, **kwargs) -> requests.Response:
+    """
+    Sends a request through the shared rate limiter.
+    A 429 pauses every caller for its Retry-After and is retried instead of being
+    returned, so throttling never surfaces as a tool error unless retries run out.
+    """
+    for attempt in range(THROTTLE_RETRIES + 1):
+        rate_limiter.acquire()
+        started = time.monotonic()
+        status_code = None
+        try:
+            response = get_session().request(
+                method,
+                f"{BASE_URL}{path}",
+                timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+                **kwargs
+            )
+            status_code = response.status_code
+        finally:
+            rate_limiter.release(status_code, time.monotonic() - started)
+
+        if status_code != 429 or attempt == THROTTLE_RETRIES:
+            if replay.REPLAY_MODE == "record":
+                replay.record_http(method, path, kwargs.get("params"), kwargs.get("json"), response)
+            return response
+
+        # Without a Retry-After header fall back to jittered exponential backoff
+        default_wait = BACKOFF_FACTOR * (2 ** attempt) + random.uniform(0, BACKOFF_FACTOR)
+        rate_limiter.on_throttle(parse_retry_after(response.headers.get("Retry-After"), default_wait))
+    return response
+
+
+def api_get(path: str, params: dict = None, headers: dict = None) -> requests.Response:
+    """Sends a GET request to the financialdatasets.ai API."""
+    return send_request("GET", path, params=params, headers=headers)
+
+
+def api_post(path: str, payload: dict, headers: dict = None) -> requests.Response:
+    """Sends a JSON POST request to the financialdatasets.ai API."""
+    return send_request("POST", path, json=payload, headers=headers)
+
+
+def check_server_filter(endpoint: str, returned: int, kept: int, end_date: str) -> None:
+    """
+    One-off check, per endpoint and process, that `report_period_lte` is equivalent to the
+    client-side filter: the first filtered response must not contain reports after `end_date`.
+    The client-side filter stays in place as the guard either way.
+    """
+    with _checked_filters_lock:
+        if endpoint in _checked_filters:
+            return
+        _checked_filters.add(endpoint)
+    if kept != returned:
+        print(
+            f"Warning: {endpoint} ignored report_period_lte ({returned - kept} reports after {end_date} returned); "
+            f"relying on the client-side filter"
+        )
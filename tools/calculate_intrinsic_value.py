@@ -2,8 +2,40 @@ from langchain.tools import tool
 from models.financial_summary import FinancialSummary, WarrenBuffettSignal
 import math
 import json
+import numpy as np
+
+# DCF assumptions
+DEFAULT_GROWTH_RATE = 0.03
+DISCOUNT_RATE = 0.09
+TERMINAL_GROWTH_RATE = 0.02
+DCF_YEARS = 10
 
 # Helper functions
+def dcf_multiple(growth, discount=DISCOUNT_RATE, terminal=TERMINAL_GROWTH_RATE, years: int = DCF_YEARS) -> np.ndarray:
+    """
+    Intrinsic value per unit of owner earnings of the 10-year, 2-stage DCF.
+    The discounted owner-earnings terms form a geometric series with ratio q = (1 + g) / (1 + r),
+    so they sum to q * (1 - q^n) / (1 - q) (n when q = 1); the terminal value adds
+    (1 + tg) / (r - tg) times that sum. Broadcasts over arrays of rates, NaN where tg >= r.
+    """
+    growth, discount, terminal = np.broadcast_arrays(
+        np.asarray(growth, dtype=np.float64),
+        np.asarray(discount, dtype=np.float64),
+        np.asarray(terminal, dtype=np.float64),
+    )
+    q = (1 + growth) / (1 + discount)
+    # q^n by repeated multiplication: unlike NumPy's pow it rounds the same for scalars and
+    # arrays, so this tool and the vectorized scoring engine give identical values
+    q_power = np.ones_like(q)
+    for _ in range(years):
+        q_power = q_power * q
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # At q = 1 the series is just `years` terms of 1; near it the closed form loses precision
+        series = np.where(np.abs(q - 1) < 1e-9, float(years), q * (1 - q_power) / (1 - q))
+        multiple = series * (1 + (1 + terminal) / (discount - terminal))
+    return np.where(discount > terminal, multiple, np.nan)
+
+
 def estimate_maintenance_capex(summary: FinancialSummary) -> float:
     """Estimates the capital expenditures required to maintain current operations."""
     # Simplified estimation using TTM data as we rely on the summary
@@ -35,17 +67,10 @@ def calculate_intrinsic_value(summary: FinancialSummary) -> dict:
     owner_earnings = owner_earnings_data["owner_earnings"]
     
     # Simplified DCF model
-    growth_rate = summary.earnings_growth if summary.earnings_growth and summary.earnings_growth > 0 else 0.03
-    discount_rate = 0.09
-    terminal_growth_rate = 0.02
-
-    # 10-year, 2-stage DCF
-    dcf_value = 0
-    for i in range(1, 11):
-        dcf_value += owner_earnings * ((1 + growth_rate) ** i) / ((1 + discount_rate) ** i)
+    growth_rate = summary.earnings_growth if summary.earnings_growth and summary.earnings_growth > 0 else DEFAULT_GROWTH_RATE
 
-    terminal_value = (dcf_value * (1 + terminal_growth_rate)) / (discount_rate - terminal_growth_rate)
-    intrinsic_value = (dcf_value + terminal_value)
+    # 10-year, 2-stage DCF (closed form of the discounted cash flows plus terminal value)
+    intrinsic_value = owner_earnings * float(dcf_multiple(growth_rate))
 
     if summary.outstanding_shares:
         intrinsic_value_per_share = intrinsic_value / summary.outstanding_shares
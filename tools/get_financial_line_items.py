@@ -1,8 +1,11 @@
 import os
-import requests
 from dotenv import load_dotenv
 from langchain.tools import tool
 
+from tools.api_cache import api_cache
+from tools.api_client import api_post
+from tools.projection import parse_projected
+
 load_dotenv()
 
 FINDAT_API_KEY = os.getenv("FINDAT_API_KEY")
@@ -40,9 +43,18 @@ def get_financial_line_items(tickers: list[str],
     Returns:
         dict: A dictionary containing the financial line items for the specified tickers.
     """
-    
 
-    url = "https://api.financialdatasets.ai/financials/search/line-items"
+    # serve repeated queries from the local cache
+    cache_params = {
+        "tickers": sorted(tickers),
+        "line_items": sorted(line_items),
+        "period": period,
+        "limit": limit,
+        "end_date": end_date,
+    }
+    cached = api_cache.get("line-items", cache_params)
+    if cached is not None:
+        return cached
 
     # check if API key is set
     if not FINDAT_API_KEY:
@@ -65,14 +77,14 @@ def get_financial_line_items(tickers: list[str],
     }
 
     # make API request
-    response = requests.post(url, headers=headers, json=payload)
+    response = api_post("/financials/search/line-items", payload, headers=headers)
 
     # if status code is 400, 401, 402 or 404 return error message
     if response.status_code != 200:
         return {"error": f"API error {response.status_code} - {response.text}"}
 
     # parse data from the response
-    data = response.json()
+    data = parse_projected(response)
     search_results = data.get("search_results")
 
     if end_date and search_results:
@@ -83,9 +95,12 @@ def get_financial_line_items(tickers: list[str],
         ]
 
         if filtered:
-            return {"search_results": filtered}
+            result = {"search_results": filtered}
+            api_cache.set("line-items", cache_params, result, end_date=end_date)
+            return result
         else:
             return {"error": f"No data found before {end_date}"}
 
     # return all search results if no end_date is specified
+    api_cache.set("line-items", cache_params, data, end_date=end_date)
     return data
\ No newline at end of file
@@ -1,8 +1,11 @@
 import os
-import requests
 from dotenv import load_dotenv
 from langchain.tools import tool
 
+from tools.api_cache import api_cache
+from tools.api_client import api_get, check_server_filter
+from tools.projection import parse_projected
+
 load_dotenv()
 
 FINDAT_API_KEY = os.getenv("FINDAT_API_KEY")
@@ -14,6 +17,12 @@ def get_financials(ticker: str,
                    end_date: str = None
                    ) -> dict:
 
+    # serve repeated queries from the local cache
+    cache_params = {"ticker": ticker, "period": period, "limit": limit, "end_date": end_date}
+    cached = api_cache.get("financials", cache_params)
+    if cached is not None:
+        return cached
+
     # check if API key is set
     if not FINDAT_API_KEY:
         raise ValueError(
@@ -25,23 +34,26 @@ def get_financials(ticker: str,
         "X-API-KEY": FINDAT_API_KEY
     }
 
-    # create the URL
-    url = (
-        f'https://api.financialdatasets.ai/financials/'
-        f'?ticker={ticker}'
-        f'&period={period}'
-        f'&limit={limit}'
-    )
+    # create the query parameters
+    params = {
+        "ticker": ticker,
+        "period": period,
+        "limit": limit,
+    }
+
+    # push the as-of date to the API so the limit window ends at the backtesting date
+    if end_date:
+        params["report_period_lte"] = end_date
 
     # make API request
-    response = requests.get(url, headers=headers)
+    response = api_get("/financials/", params=params, headers=headers)
 
     # if status code is 400, 401, 402 or 404 return error message
     if response.status_code != 200:
         return {"error": f"API error {response.status_code} - {response.text}"}
 
     # parse data from the response
-    data = response.json()
+    data = parse_projected(response)
     financials = data.get('financials')
 
     selected_financials = {}
@@ -62,15 +74,20 @@ def get_financials(ticker: str,
                 if f.get('report_period') and f.get('report_period') <= end_date
             ]
             
+            # the API already applies report_period_lte, so this should never drop anything
+            check_server_filter(f"/financials/ {key}", len(statements_list), len(filtered), end_date)
+
             if filtered:
                 selected_financials[key] = filtered 
             else:
                 print(f"Warning: No data found for {key} before {end_date}")
 
         if selected_financials:
+            api_cache.set("financials", cache_params, selected_financials, end_date=end_date)
             return selected_financials
         else:
             return {"error": f"No financial data found before {end_date}"}
 
     # return all financials if no end_date is specified
+    api_cache.set("financials", cache_params, data, end_date=end_date)
     return data
\ No newline at end of file
@@ -1,8 +1,11 @@
 import os
-import requests
 from dotenv import load_dotenv
 from langchain.tools import tool
 
+from tools.api_cache import api_cache
+from tools.api_client import api_get, check_server_filter
+from tools.projection import parse_projected
+
 load_dotenv()
 
 FINDAT_API_KEY = os.getenv("FINDAT_API_KEY")
@@ -56,7 +59,13 @@ def get_metrics(ticker: str,
     - book_value_per_share (number): Shareholders' equity divided by shares outstanding.
     - free_cash_flow_per_share (number): Free cash flow divided by shares outstanding.
     '''
-    
+
+    # serve repeated queries from the local cache
+    cache_params = {"ticker": ticker, "period": period, "limit": limit, "end_date": end_date}
+    cached = api_cache.get("financial-metrics", cache_params)
+    if cached is not None:
+        return cached
+
     if not FINDAT_API_KEY:
         raise ValueError(
             "API key for Financial Datasets not found. Please set the FINDAT_API_KEY environment variable."
@@ -67,23 +76,26 @@ def get_metrics(ticker: str,
         "X-API-KEY": FINDAT_API_KEY
     }
 
-    # create the URL
-    url = (
-        f'https://api.financialdatasets.ai/financial-metrics'
-        f'?ticker={ticker}'
-        f'&period={period}'
-        f'&limit={limit}'
-    )
+    # create the query parameters
+    params = {
+        "ticker": ticker,
+        "period": period,
+        "limit": limit,
+    }
+
+    # push the as-of date to the API so the limit window ends at the backtesting date
+    if end_date:
+        params["report_period_lte"] = end_date
 
     # make API request
-    response = requests.get(url, headers=headers)
+    response = api_get("/financial-metrics", params=params, headers=headers)
 
     # if status code is 400, 401, 402 or 404 return error message
     if response.status_code != 200:
         return {"error": f"API error {response.status_code} - {response.text}"}
 
     # parse data from the response
-    data = response.json()
+    data = parse_projected(response)
     metrics = data.get('financial_metrics')
 
     if end_date and metrics:
@@ -93,11 +105,17 @@ def get_metrics(ticker: str,
             m for m in metrics
             if m.get('report_period') and m.get('report_period') <= end_date
         ]
+
+        # the API already applies report_period_lte, so this should never drop anything
+        check_server_filter("/financial-metrics", len(metrics), len(filtered), end_date)
         
         if filtered:
-            return {"financial_metrics": filtered}
+            result = {"financial_metrics": filtered}
+            api_cache.set("financial-metrics", cache_params, result, end_date=end_date)
+            return result
         else:
             return {"error": f"No data found before {end_date}"}
 
     # return all metrics if no end_date is specified
+    api_cache.set("financial-metrics", cache_params, data, end_date=end_date)
     return data
\ No newline at end of file
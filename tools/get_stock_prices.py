@@ -1,13 +1,65 @@
 import os
-import requests
 from dotenv import load_dotenv
 from langchain.tools import tool
 from datetime import datetime, timedelta
 
+from tools.api_cache import api_cache
+from tools.api_client import api_get
+from tools.projection import parse_projected
+from tools.price_store import price_store
+
 load_dotenv()
 
 FINDAT_API_KEY = os.getenv("FINDAT_API_KEY")
 
+
+def fetch_prices(ticker: str,
+                 start_date: str,
+                 end_date: str,
+                 interval: str = 'day',
+                 interval_multiplier: int = 1,
+                 use_cache: bool = True
+                 ) -> dict:
+    """
+    Downloads stock prices for a date range from the API.
+    """
+
+    # serve repeated queries from the local cache
+    cache_params = {
+        "ticker": ticker,
+        "interval": interval,
+        "interval_multiplier": interval_multiplier,
+        "start_date": start_date,
+        "end_date": end_date,
+    }
+    cached = api_cache.get("prices", cache_params) if use_cache else None
+    if cached is not None:
+        return cached
+
+    if not FINDAT_API_KEY:
+        raise ValueError(
+            "API key for Financial Datasets not found. Please set the FINDAT_API_KEY environment variable."
+        )
+
+    # add your API key to the headers
+    headers = {
+        "X-API-KEY": FINDAT_API_KEY
+        }
+
+    # make API request
+    response = api_get("/prices/", params=cache_params, headers=headers)
+
+    # if status code is 400, 401, 402 or 404 return error message
+    if response.status_code != 200:
+        return {"error": f"API error {response.status_code} - {response.text}"}
+
+    # parse data from the response
+    data = parse_projected(response)
+    if use_cache:
+        api_cache.set("prices", cache_params, data, end_date=end_date)
+    return data
+
+
 @tool(description="Get historical stock prices for a given ticker symbol")
 def get_stock_prices(ticker: str, 
                      start_date: str = None, 
@@ -46,33 +98,34 @@ def get_stock_prices(ticker: str,
 
     end_date = dt_end.strftime('%Y-%m-%d')
 
-    # create the URL
-    url = (
-        f'https://api.financialdatasets.ai/prices/'
-        f'?ticker={ticker}'
-        f'&interval={interval}'
-        f'&interval_multiplier={interval_multiplier}'
-        f'&start_date={start_date}'
-        f'&end_date={end_date}'
-    )
-    
-    if not FINDAT_API_KEY:
-        raise ValueError(
-            "API key for Financial Datasets not found. Please set the FINDAT_API_KEY environment variable."
-        )
+    # daily candles are answered from the local price store, fetching only the missing days
+    if interval == 'day' and interval_multiplier == 1:
+        error = None
+        for missing_start, missing_end in price_store.missing_ranges(ticker, start_date, end_date):
+            data = fetch_prices(ticker, missing_start, missing_end, use_cache=False)
+            if "error" in data:
+                error = data
+                continue
+            price_store.append(ticker, data.get("prices") or [], missing_start, missing_end)
 
-    # add your API key to the headers
-    headers = {
-        "X-API-KEY": FINDAT_API_KEY
-        }
+        # a failed range (e.g. today's, never covered) only matters when nothing is stored
+        prices = price_store.query(ticker, start_date, end_date)
+        if not prices and error is not None:
+            return error
+        return {"ticker": ticker, "prices": prices}
 
-    # make API request
-    response = requests.get(url, headers=headers)
+    return fetch_prices(ticker, start_date, end_date, interval, interval_multiplier)
 
-    # if status code is 400, 401, 402 or 404 return error message
-    if response.status_code != 200:
-        return {"error": f"API error {response.status_code} - {response.text}"}
 
-    # parse data from the response
-    data = response.json()
-    return data
\ No newline at end of file
+def latest_close(ticker: str, as_of: str = None) -> float:
+    """
+    Returns the last daily close in the 7 days up to `as_of` (today by default), so a halted
+    or delisted ticker gets None rather than a stale price. Only the days of that window not
+    yet in the local price store are fetched. Raises ValueError when the API failed and
+    nothing is stored.
+    """
+    data = get_stock_prices.func(ticker, end_date=as_of)
+    if "error" in data:
+        raise ValueError(data["error"])
+    closes = [p["close"] for p in data.get("prices") or [] if p.get("close") is not None]
+    return closes[-1] if closes else None
@@ -0,0 +1,152 @@
+import os
+import json
+import threading
+import numpy as np
+from datetime import datetime
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PRICE_STORE_DIR = os.getenv("PRICE_STORE_DIR", os.path.join(".cache", "prices"))
+
+# One array per column, aligned on the `dates` array
+COLUMNS = ("open", "high", "low", "close", "volume")
+
+
+def to_day(date_str: str) -> np.datetime64:
+    """Converts a YYYY-MM-DD (or ISO timestamp) string to a numpy day."""
+    return np.datetime64(date_str[:10], "D")
+
+
+def merge_ranges(ranges: list) -> list:
+    """Merges overlapping or adjacent (start, end) day ranges into a sorted list."""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + np.timedelta64(1, "D"):
+            merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class PriceStore:
+    """
+    Local columnar store of daily OHLCV candles.
+
+    Each ticker lives in its own directory with one `.npy` file per column plus a
+    `meta.json` recording the date ranges already fetched from the API
+    (weekends and holidays included, so they are never requested twice).
+    Files are opened memory-mapped, so range and latest-close queries are local reads.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._loaded = {}
+        self._lock = threading.Lock()
+
+    def _ticker_dir(self, ticker: str) -> str:
+        return os.path.join(self.directory, ticker.replace("/", "_"))
+
+    def _load(self, ticker: str) -> dict:
+        if ticker in self._loaded:
+            return self._loaded[ticker]
+
+        ticker_dir = self._ticker_dir(ticker)
+        table = {"coverage": [], "dates": np.array([], dtype="datetime64[D]")}
+        table.update({col: np.array([], dtype=np.float64) for col in COLUMNS})
+        try:
+            with open(os.path.join(ticker_dir, "meta.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            table["coverage"] = [(to_day(start), to_day(end)) for start, end in meta["coverage"]]
+            for name in ("dates",) + COLUMNS:
+                table[name] = np.load(os.path.join(ticker_dir, f"{name}.npy"), mmap_mode="r")
+        except (OSError, ValueError, KeyError):
+            pass
+
+        self._loaded[ticker] = table
+        return table
+
+    def missing_ranges(self, ticker: str, start_date: str, end_date: str) -> list:
+        """Returns the (start, end) date ranges that must be fetched to answer a query."""
+        start, end = to_day(start_date), to_day(end_date)
+        with self._lock:
+            coverage = list(self._load(ticker)["coverage"])
+
+        one_day = np.timedelta64(1, "D")
+        ranges = []
+        cursor = start
+        for cov_start, cov_end in coverage:
+            if cov_end < cursor:
+                continue
+            if cov_start > end:
+                break
+            if cov_start > cursor:
+                ranges.append((str(cursor), str(cov_start - one_day)))
+            cursor = max(cursor, cov_end + one_day)
+        if cursor <= end:
+            ranges.append((str(cursor), str(end)))
+        return ranges
+
+    def append(self, ticker: str, prices: list, start_date: str, end_date: str) -> None:
+        """
+        Merges newly fetched candles into the store and extends the covered range.
+        Today's candle may still change, so coverage never extends past yesterday.
+        """
+        new_dates = np.array([to_day(p["time"]) for p in prices if p.get("time")], dtype="datetime64[D]")
+        new_cols = {
+            col: np.array([p.get(col) for p in prices if p.get("time")], dtype=np.float64)
+            for col in COLUMNS
+        }
+
+        yesterday = np.datetime64(datetime.now().strftime('%Y-%m-%d'), "D") - np.timedelta64(1, "D")
+        start, end = to_day(start_date), min(to_day(end_date), yesterday)
+
+        with self._lock:
+            table = self._load(ticker)
+
+            # Newly fetched rows win over stored rows for the same date
+            dates = np.concatenate([new_dates, table["dates"]])
+            dates, index = np.unique(dates, return_index=True)
+            merged = {"dates": dates}
+            for col in COLUMNS:
+                merged[col] = np.concatenate([new_cols[col], table[col]])[index]
+
+            coverage = merge_ranges(table["coverage"] + ([(start, end)] if end >= start else []))
+            self._save(ticker, merged, coverage)
+
+    def _save(self, ticker: str, merged: dict, coverage) -> None:
+        ticker_dir = self._ticker_dir(ticker)
+        os.makedirs(ticker_dir, exist_ok=True)
+
+        # Write each column to a temporary file first so readers never see a partial array
+        for name, values in merged.items():
+            tmp_path = os.path.join(ticker_dir, f"{name}.tmp.npy")
+            np.save(tmp_path, values)
+            os.replace(tmp_path, os.path.join(ticker_dir, f"{name}.npy"))
+
+        with open(os.path.join(ticker_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"coverage": [[str(start), str(end)] for start, end in coverage]}, f)
+
+        merged["coverage"] = coverage
+        self._loaded[ticker] = merged
+
+    def query(self, ticker: str, start_date: str, end_date: str) -> list:
+        """Returns the stored candles between start_date and end_date (inclusive), oldest first."""
+        with self._lock:
+            table = self._load(ticker)
+        dates = table["dates"]
+        lo = np.searchsorted(dates, to_day(start_date), side="left")
+        hi = np.searchsorted(dates, to_day(end_date), side="right")
+
+        rows = []
+        for i in range(lo, hi):
+            row = {"ticker": ticker, "time": str(dates[i])}
+            for col in COLUMNS:
+                value = float(table[col][i])
+                row[col] = None if np.isnan(value) else value
+            rows.append(row)
+        return rows
+
+
+# Shared store instance used by get_stock_prices
+price_store = PriceStore(PRICE_STORE_DIR)
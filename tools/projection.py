@@ -0,0 +1,65 @@
+import os
+import json
+from dotenv import load_dotenv
+
+from models.financial_summary import FinancialSummary
+
+load_dotenv()
+
+# Keys that only give the payloads their shape (statement groups, result lists)
+STRUCTURAL_KEYS = {
+    "financials",
+    "income_statements",
+    "balance_sheets",
+    "cash_flow_statements",
+    "financial_metrics",
+    "search_results",
+    "prices",
+    "snapshot",
+}
+
+# Fields kept besides the ones that map into FinancialSummary
+EXTRA_FIELDS = {
+    # identification of each row
+    "ticker",
+    "report_period",
+    "fiscal_period",
+    "period",
+    "currency",
+    # aliases of FinancialSummary fields used by the line-item search
+    "weighted_average_shares",
+    "total_revenue",
+    # price candles
+    "time",
+    "open",
+    "high",
+    "low",
+    "close",
+    "volume",
+    # used for data-quality checks across tools
+    "operating_income",
+    "net_cash_flow_from_operations",
+    "total_debt",
+    "cash_and_equivalents",
+}
+EXTRA_FIELDS |= {f.strip() for f in os.getenv("FINDAT_EXTRA_FIELDS", "").split(",") if f.strip()}
+
+KEPT_FIELDS = set(FinancialSummary.model_fields) | EXTRA_FIELDS | STRUCTURAL_KEYS
+
+
+def project_pairs(pairs: list) -> dict:
+    """object_pairs_hook keeping only the declared fields of each decoded JSON object."""
+    return {key: value for key, value in pairs if key in KEPT_FIELDS}
+
+
+_decoder = json.JSONDecoder(object_pairs_hook=project_pairs)
+
+
+def parse_projected(response) -> dict:
+    """
+    Decodes an API response keeping only the fields the pipeline uses.
+
+    The projection runs inside the JSON decoder, object by object, so the dropped
+    fields never make it into the dicts that are returned, cached and serialized.
+    """
+    return _decoder.decode(response.text)
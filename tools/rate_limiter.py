@@ -0,0 +1,121 @@
+import os
+import time
+import threading
+from email.utils import parsedate_to_datetime
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Rate limiter configuration (overridable through the environment / .env file)
+RATE_LIMIT_PER_SECOND = float(os.getenv("FINDAT_RATE_LIMIT", "10"))
+RATE_LIMIT_BURST = int(os.getenv("FINDAT_RATE_BURST", "20"))
+MIN_CONCURRENCY = int(os.getenv("FINDAT_MIN_CONCURRENCY", "1"))
+MAX_CONCURRENCY = int(os.getenv("FINDAT_MAX_CONCURRENCY", "32"))
+LATENCY_TARGET = float(os.getenv("FINDAT_LATENCY_TARGET", "5"))
+
+
+def parse_retry_after(value: str, default: float = 1.0) -> float:
+    """Parses a Retry-After header, given either in seconds or as an HTTP date."""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
+class RateLimiter:
+    """
+    Process-wide limiter for the financialdatasets.ai API.
+
+    Combines a token bucket (requests per second, with a burst allowance) with an
+    AIMD concurrency window: every successful fast response grows the window
+    additively, every 429 or slow response shrinks it multiplicatively.
+    A 429 also pauses all callers until its Retry-After has elapsed.
+    """
+
+    def __init__(self, rate: float, burst: int, min_concurrency: int, max_concurrency: int, latency_target: float):
+        self.rate = rate
+        self.burst = burst
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.latency_target = latency_target
+
+        self.concurrency = float(max_concurrency)
+        self.tokens = float(burst)
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self._last_refill = time.monotonic()
+        self._cond = threading.Condition()
+
+        self.requests = 0
+        self.throttled = 0
+        self.throttle_wait = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def acquire(self) -> None:
+        """Blocks until a concurrency slot and a token are available."""
+        started = time.monotonic()
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                elif self.in_flight >= int(self.concurrency):
+                    wait = None
+                elif self.tokens < 1:
+                    wait = (1 - self.tokens) / self.rate
+                else:
+                    break
+                self._cond.wait(wait)
+
+            self.tokens -= 1
+            self.in_flight += 1
+            self.requests += 1
+            self.throttle_wait += time.monotonic() - started
+
+    def release(self, status_code: int = None, latency: float = 0.0) -> None:
+        """Frees the slot taken by `acquire` and adapts the concurrency window."""
+        with self._cond:
+            self.in_flight -= 1
+            if status_code == 429 or latency > self.latency_target:
+                self.concurrency = max(self.min_concurrency, self.concurrency / 2)
+            elif status_code is not None and status_code < 500:
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+            self._cond.notify_all()
+
+    def on_throttle(self, retry_after: float) -> None:
+        """Pauses every caller after a 429 until `retry_after` seconds have passed."""
+        with self._cond:
+            self.throttled += 1
+            self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+            self.tokens = 0.0
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        """Returns throttling statistics for the current process."""
+        return {
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "throttle_wait_seconds": self.throttle_wait,
+            "concurrency": int(self.concurrency),
+        }
+
+
+# Shared limiter instance used by all the financialdatasets.ai tools
+rate_limiter = RateLimiter(
+    rate=RATE_LIMIT_PER_SECOND,
+    burst=RATE_LIMIT_BURST,
+    min_concurrency=MIN_CONCURRENCY,
+    max_concurrency=MAX_CONCURRENCY,
+    latency_target=LATENCY_TARGET,
+)
@@ -0,0 +1,233 @@
+"""
+Vectorized version of the Warren Buffett analyzer tools.
+
+Loads many `FinancialSummary` records into NumPy columns and computes every component
+score, reasoning flag and intrinsic value in one pass. `analyzer_results` rebuilds, for
+one ticker, exactly the dicts the per-ticker `analyze_*` / `calculate_intrinsic_value`
+tools return. With `FinancialHistory` data, the consistency, book value growth and pricing
+power components are scored on the multi-year trends instead (see tools/analyze_trends.py).
+"""
+from typing import Dict, List
+
+import numpy as np
+
+from models.financial_summary import FinancialSummary
+from models.financial_history import FinancialHistory
+from models.summary_table import FinancialSummaryTable
+from tools.analyze_trends import analyze_trends, MIN_PERIODS, TREND_COMPONENTS
+from tools.calculate_intrinsic_value import DEFAULT_GROWTH_RATE, dcf_multiple
+
+# Scoring rules of each analyzer, in the order the per-ticker tools check them:
+# (field, comparison, threshold, points, reasoning). Missing values never pass a rule.
+RULES = {
+    "fundamentals": [
+        ("return_on_equity", ">", 0.15, 2, "Strong ROE of {value:.1%}"),
+        ("debt_to_equity", "<", 0.5, 2, "Conservative debt levels."),
+        ("operating_margin", ">", 0.15, 2, "Strong operating margins."),
+        ("current_ratio", ">", 1.5, 1, "Good liquidity position."),
+    ],
+    "consistency": [
+        ("earnings_growth", ">", 0.05, 3, "Consistent earnings growth."),
+    ],
+    "moat": [
+        ("return_on_invested_capital", ">", 0.15, 2, "High ROIC suggests a strong moat."),
+        ("gross_margin", ">", 0.4, 1, "High gross margins indicate pricing power."),
+    ],
+    "management": [
+        ("issuance_or_purchase_of_equity_shares", "<", 0, 1, "Company has been repurchasing shares."),
+        ("payout_ratio", ">", 0, 1, "Company pays dividends."),
+    ],
+    "book_value_growth": [
+        ("book_value_growth", ">", 0.1, 2, "Strong book value growth."),
+    ],
+    "pricing_power": [
+        ("gross_margin", ">", 0.4, 2, "High gross margins suggest strong pricing power."),
+    ],
+}
+
+VALUATION_FIELDS = [
+    "price",
+    "net_income",
+    "depreciation_and_amortization",
+    "capital_expenditure",
+    "earnings_growth",
+    "outstanding_shares",
+]
+
+# Highest summed score a ticker can reach
+MAX_TOTAL_SCORE = sum(rule[3] for rules in RULES.values() for rule in rules)
+
+SCORED_FIELDS = sorted({rule[0] for rules in RULES.values() for rule in rules} | set(VALUATION_FIELDS))
+
+
+def summary_columns(summaries: List[FinancialSummary], fields: List[str] = None) -> Dict[str, np.ndarray]:
+    """
+    Loads the summaries into float64 columns, None becoming NaN.
+    A `FinancialSummaryTable` already holds them as columns and is used as-is.
+    """
+    fields = fields or SCORED_FIELDS
+    if isinstance(summaries, FinancialSummaryTable):
+        return summaries.columns(fields)
+    columns = {"ticker": np.array([s.ticker for s in summaries], dtype=object)}
+    for field in fields:
+        columns[field] = np.array(
+            [np.nan if getattr(s, field) is None else getattr(s, field) for s in summaries],
+            dtype=np.float64,
+        )
+    return columns
+
+
+def rule_key(component: str, field: str) -> str:
+    """Name under which a rule threshold can be overridden, e.g. "fundamentals.return_on_equity"."""
+    return f"{component}.{field}"
+
+
+def score_columns(columns: Dict[str, np.ndarray], thresholds: Dict[str, float] = None) -> dict:
+    """
+    Scores every row of the columns.
+    `thresholds` overrides rule thresholds by `rule_key`, for cheap re-scoring.
+    Returns {"scores": {component: int array}, "flags": {component: [bool array per rule]}}.
+    """
+    thresholds = thresholds or {}
+    scores, flags = {}, {}
+    with np.errstate(invalid="ignore"):
+        for component, rules in RULES.items():
+            component_flags = []
+            score = np.zeros(len(columns["ticker"]), dtype=np.int64)
+            for field, comparison, threshold, points, _ in rules:
+                threshold = thresholds.get(rule_key(component, field), threshold)
+                values = columns[field]
+                # NaN compares False, like the falsy checks of the per-ticker tools
+                passed = values > threshold if comparison == ">" else values < threshold
+                score += passed * points
+                component_flags.append(passed)
+            scores[component] = score
+            flags[component] = component_flags
+    return {"scores": scores, "flags": flags}
+
+
+def value_columns(columns: Dict[str, np.ndarray]) -> dict:
+    """
+    Computes owner earnings and the 10-year two-stage DCF for every row.
+    Rows without owner earnings get NaN.
+    """
+    net_income = columns["net_income"]
+    depreciation = columns["depreciation_and_amortization"]
+    capex = columns["capital_expenditure"]
+
+    # Owner earnings need non-zero net income, D&A and capex; maintenance capex is estimated as D&A
+    has_inputs = np.nan_to_num(net_income) != 0
+    has_inputs &= np.nan_to_num(depreciation) != 0
+    has_inputs &= np.nan_to_num(capex) != 0
+    owner_earnings = np.where(has_inputs, net_income + depreciation - depreciation, np.nan)
+    owner_earnings[owner_earnings == 0] = np.nan
+
+    growth = columns["earnings_growth"]
+    with np.errstate(invalid="ignore"):
+        growth_rate = np.where(growth > 0, growth, DEFAULT_GROWTH_RATE)
+
+    # Same closed-form DCF as the per-ticker tool, for every row at once
+    intrinsic_value = owner_earnings * dcf_multiple(growth_rate)
+
+    shares = columns["outstanding_shares"]
+    has_shares = np.nan_to_num(shares) != 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        per_share = np.where(has_shares, intrinsic_value / np.where(has_shares, shares, 1), 0.0)
+    per_share[np.isnan(intrinsic_value)] = np.nan
+
+    # Margin of safety: discount of the price to the per-share value (NaN without a positive value or a price)
+    price = columns["price"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        margin_of_safety = np.where((per_share > 0) & (price > 0), (per_share - price) / per_share, np.nan)
+
+    return {
+        "owner_earnings": owner_earnings,
+        "intrinsic_value": intrinsic_value,
+        "intrinsic_value_per_share": per_share,
+        "margin_of_safety": margin_of_safety,
+    }
+
+
+def total_scores(table: dict) -> np.ndarray:
+    """Sum of the component scores of every row."""
+    return sum(table["scores"].values())
+
+
+def apply_trends(table: dict, trends: Dict[str, dict]) -> None:
+    """
+    Replaces the single-scalar consistency, book value growth and pricing power scores with
+    the trend scores of `analyze_trends`, for the rows whose history has at least MIN_PERIODS
+    values for that component; the scalar rules remain the fallback.
+    The trend results used are kept as table["trends"] = {index: {component: trend}}.
+    """
+    overrides = {}
+    for index, ticker in enumerate(table["columns"]["ticker"]):
+        ticker_trends = trends.get(ticker)
+        if not ticker_trends:
+            continue
+        for component in TREND_COMPONENTS:
+            trend = ticker_trends[component]
+            if trend["periods"] >= MIN_PERIODS:
+                table["scores"][component][index] = trend["score"]
+                overrides.setdefault(index, {})[component] = trend
+    table["trends"] = overrides
+
+
+def score_universe(
+        summaries: List[FinancialSummary],
+        thresholds: Dict[str, float] = None,
+        histories: List[FinancialHistory] = None
+        ) -> dict:
+    """
+    Scores and values a whole list of summaries in one pass.
+    With `histories`, the trend components are scored on them where there is enough history.
+    """
+    columns = summary_columns(summaries)
+    table = score_columns(columns, thresholds)
+    table.update(value_columns(columns))
+    table["columns"] = columns
+    apply_trends(table, analyze_trends(histories) if histories else {})
+    return table
+
+
+def intrinsic_value_per_share(table: dict, index: int):
+    """Per-share value of one row; 0 (an int, as the per-ticker tool returns) without share count."""
+    if np.nan_to_num(table["columns"]["outstanding_shares"][index]) == 0:
+        return 0
+    return float(table["intrinsic_value_per_share"][index])
+
+
+def analyzer_results(table: dict, index: int) -> dict:
+    """
+    Rebuilds the per-ticker analyzer outputs of one row, as `warren_buffett_agent` passes
+    them to the LLM (same keys, scores and reasoning strings). Components scored on the
+    trends return the trend result, with its figures.
+    """
+    columns = table["columns"]
+    trends = table.get("trends", {}).get(index, {})
+    results = {}
+    for component, rules in RULES.items():
+        if component in trends:
+            results[component] = trends[component]
+            continue
+        reasoning = [
+            template.format(value=float(columns[field][index]))
+            for (field, _, _, _, template), passed in zip(rules, table["flags"][component])
+            if passed[index]
+        ]
+        results[component] = {"score": int(table["scores"][component][index]), "details": "; ".join(reasoning)}
+
+    intrinsic_value = table["intrinsic_value"][index]
+    if np.isnan(intrinsic_value):
+        results["intrinsic_value"] = {"intrinsic_value": None, "details": "Could not calculate owner earnings."}
+    else:
+        intrinsic_value = float(intrinsic_value)
+        results["intrinsic_value"] = {
+            "intrinsic_value": intrinsic_value,
+            "intrinsic_value_per_share": intrinsic_value_per_share(table, index),
+            "details": f"Intrinsic value estimated at ${intrinsic_value:,.0f}.",
+        }
+
+    # Same key order as warren_buffett_agent builds
+    order = ["fundamentals", "consistency", "moat", "management", "book_value_growth", "intrinsic_value", "pricing_power"]
+    return {key: results[key] for key in order}
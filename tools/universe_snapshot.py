@@ -0,0 +1,124 @@
+import os
+import json
+import hashlib
+import struct
+import threading
+from datetime import datetime
+from typing import List
+from dotenv import load_dotenv
+
+import numpy as np
+
+from models.summary_table import FinancialSummaryTable, SUMMARY_FIELDS
+
+load_dotenv()
+
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", os.path.join(".cache", "snapshots"))
+
+# File layout: MAGIC, header length (uint64), JSON header, padding, then the summary matrix
+MAGIC = b"FINSNAP1"
+ALIGNMENT = 64
+
+
+def snapshot_path(tickers: List[str], as_of: str = None, debug: bool = False) -> str:
+    """
+    Returns the snapshot file of a run.
+    Runs over the same ticker universe and as-of date share a file (latest runs are keyed by
+    today's date); debug runs get their own files so they never replace a real run's snapshot.
+    """
+    run_date = as_of or f"latest-{datetime.now().strftime('%Y-%m-%d')}"
+    digest = hashlib.sha256(",".join(sorted(tickers)).encode("utf-8")).hexdigest()[:12]
+    prefix = "debug_universe" if debug else "universe"
+    return os.path.join(SNAPSHOT_DIR, f"{prefix}_{run_date}_{digest}.snap")
+
+
+def save_snapshot(
+        path: str,
+        table: FinancialSummaryTable,
+        signals: dict,
+        price_map: dict,
+        as_of: str = None
+        ) -> None:
+    """
+    Writes the research summaries, Buffett signals and price map of a run into one file.
+    The summaries are stored as a raw (fields x tickers) float64 matrix that can be memory-mapped.
+    """
+    header = json.dumps({
+        "as_of": as_of,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "tickers": [str(ticker) for ticker in table.tickers],
+        "fields": SUMMARY_FIELDS,
+        "signals": signals,
+        "price_map": price_map,
+    }).encode("utf-8")
+    prefix = len(MAGIC) + 8 + len(header)
+    padding = -prefix % ALIGNMENT
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # Write to a temporary file first so a concurrent reader never maps a partial snapshot
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        f.write(b"\0" * padding)
+        f.write(np.ascontiguousarray(table.values, dtype="<f8").tobytes())
+    os.replace(tmp_path, path)
+
+
+class UniverseSnapshot:
+    """
+    Read side of a snapshot. Only the small JSON header is parsed on open; the summary
+    matrix is memory-mapped the first time `table` is used.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a universe snapshot")
+            (length,) = struct.unpack("<Q", f.read(8))
+            self.header = json.loads(f.read(length))
+        prefix = len(MAGIC) + 8 + length
+        self._offset = prefix + (-prefix % ALIGNMENT)
+        self._table = None
+
+    @property
+    def as_of(self) -> str:
+        return self.header["as_of"]
+
+    @property
+    def tickers(self) -> list:
+        return self.header["tickers"]
+
+    @property
+    def signals(self) -> dict:
+        return self.header["signals"]
+
+    @property
+    def price_map(self) -> dict:
+        return self.header["price_map"]
+
+    @property
+    def table(self) -> FinancialSummaryTable:
+        """The research summaries, backed by the memory-mapped file."""
+        if self._table is None:
+            if self.header["fields"] != SUMMARY_FIELDS:
+                raise ValueError(f"{self.path} was written with a different FinancialSummary layout")
+            shape = (len(SUMMARY_FIELDS), len(self.tickers))
+            if not self.tickers:
+                values = np.empty(shape)
+            else:
+                values = np.memmap(self.path, dtype="<f8", mode="r", offset=self._offset, shape=shape)
+            self._table = FinancialSummaryTable(self.tickers, values)
+        return self._table
+
+
+def open_snapshot(path: str):
+    """Opens a snapshot, or returns None when there is no usable one at `path`."""
+    try:
+        return UniverseSnapshot(path)
+    except (OSError, ValueError) as e:
+        if os.path.exists(path):
+            print(f"Warning: ignoring snapshot {path}: {e}")
+        return None
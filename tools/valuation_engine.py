@@ -0,0 +1,112 @@
+"""
+Scenario analysis on top of the closed-form two-stage DCF (`dcf_multiple` in
+calculate_intrinsic_value). Every function broadcasts, so a whole universe can be valued
+over grids or Monte Carlo samples of growth, discount and terminal rates in one NumPy expression.
+"""
+import warnings
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from models.financial_summary import FinancialSummary
+from tools.calculate_intrinsic_value import DEFAULT_GROWTH_RATE, DISCOUNT_RATE, TERMINAL_GROWTH_RATE, dcf_multiple
+from tools.scoring_engine import summary_columns, value_columns, VALUATION_FIELDS
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def valuation_inputs(summaries: List[FinancialSummary]) -> Dict[str, np.ndarray]:
+    """Owner earnings, share counts, prices and base growth rates of the summaries."""
+    columns = summary_columns(summaries, VALUATION_FIELDS)
+    values = value_columns(columns)
+    growth = columns["earnings_growth"]
+    with np.errstate(invalid="ignore"):
+        base_growth = np.where(growth > 0, growth, DEFAULT_GROWTH_RATE)
+    shares = columns["outstanding_shares"]
+    return {
+        "ticker": columns["ticker"],
+        "owner_earnings": values["owner_earnings"],
+        "shares": np.where(np.nan_to_num(shares) != 0, shares, np.nan),
+        "price": columns["price"],
+        "growth": base_growth,
+    }
+
+
+def scenario_values(inputs: Dict[str, np.ndarray], multiple: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Per-share values and margins of safety from DCF multiples whose first axis is the ticker
+    and whose trailing axes are the rate scenarios.
+    """
+    trailing = (1,) * (multiple.ndim - 1)
+    owner_earnings = inputs["owner_earnings"].reshape(-1, *trailing)
+    shares = inputs["shares"].reshape(-1, *trailing)
+    price = inputs["price"].reshape(-1, *trailing)
+    per_share = owner_earnings * multiple / shares
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mos = np.where((per_share > 0) & (price > 0), (per_share - price) / per_share, np.nan)
+    return {"ticker": inputs["ticker"], "intrinsic_value_per_share": per_share, "margin_of_safety": mos}
+
+
+def sensitivity_grid(
+        summaries: List[FinancialSummary],
+        growth_shifts: Sequence[float] = (-0.02, -0.01, 0.0, 0.01, 0.02),
+        discount_rates: Sequence[float] = (0.07, 0.08, 0.09, 0.10, 0.11),
+        terminal_rates: Sequence[float] = (0.01, 0.02, 0.03)
+        ) -> Dict[str, np.ndarray]:
+    """
+    Values every ticker over the full grid of growth (each ticker's base growth plus a shift),
+    discount and terminal rates.
+    Returns per-share values and margins of safety of shape (tickers, growths, discounts, terminals).
+    """
+    inputs = valuation_inputs(summaries)
+    growth = inputs["growth"][:, None] + np.asarray(growth_shifts)[None, :]
+    multiple = dcf_multiple(
+        growth[:, :, None, None],
+        np.asarray(discount_rates)[None, None, :, None],
+        np.asarray(terminal_rates)[None, None, None, :],
+    )
+    return scenario_values(inputs, multiple)
+
+
+def monte_carlo(
+        summaries: List[FinancialSummary],
+        samples: int = 2000,
+        growth_sd: float = 0.02,
+        discount_sd: float = 0.01,
+        terminal_sd: float = 0.005,
+        seed: int = None
+        ) -> Dict[str, np.ndarray]:
+    """
+    Values every ticker under random rate scenarios: growth around each ticker's base
+    growth, discount and terminal rates around the defaults (normal draws, shared by all
+    tickers within a sample). Returns arrays of shape (tickers, samples).
+    """
+    inputs = valuation_inputs(summaries)
+    rng = np.random.default_rng(seed)
+    growth = inputs["growth"][:, None] + rng.normal(0.0, growth_sd, samples)[None, :]
+    discount = rng.normal(DISCOUNT_RATE, discount_sd, samples)[None, :]
+    terminal = rng.normal(TERMINAL_GROWTH_RATE, terminal_sd, samples)[None, :]
+    return scenario_values(inputs, dcf_multiple(growth, discount, terminal))
+
+
+def distribution_summary(scenarios: Dict[str, np.ndarray], percentiles: Sequence[float] = PERCENTILES) -> dict:
+    """
+    Per-ticker percentiles of the intrinsic value per share and of the margin of safety
+    over all scenarios of a `sensitivity_grid` or `monte_carlo` result.
+    Returns {ticker: {"intrinsic_value_per_share": {p: value}, "margin_of_safety": {p: value}}}.
+    """
+    summary = {ticker: {} for ticker in scenarios["ticker"]}
+    if not summary:
+        # An empty universe cannot be reshaped per ticker
+        return summary
+    for key in ("intrinsic_value_per_share", "margin_of_safety"):
+        values = scenarios[key].reshape(len(scenarios["ticker"]), -1)
+        with warnings.catch_warnings():
+            # All-NaN rows (no owner earnings) warn and give NaN, which is what we want
+            warnings.simplefilter("ignore", RuntimeWarning)
+            points = np.nanpercentile(values, percentiles, axis=1)
+        for i, ticker in enumerate(scenarios["ticker"]):
+            summary[ticker][key] = {
+                p: None if np.isnan(points[j, i]) else float(points[j, i]) for j, p in enumerate(percentiles)
+            }
+    return summary